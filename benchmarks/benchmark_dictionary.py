@@ -0,0 +1,137 @@
+"""
+Benchmark of the Dictionary tree algorithms
+
+Compares the previous recursive implementations of the merge and remove_none
+    traversals against the current explicit-stack and in-place ones, over wide (balanced)
+    and deep (chained) trees of the given amount of nodes.
+
+    $ poetry run python benchmarks/benchmark_dictionary.py --nodes 10000 1000000
+"""
+from pyxavi import Dictionary
+import argparse
+import copy
+import time
+
+BRANCHING = 10
+
+
+def legacy_merge_simple_recursive(base_dict: dict, over_dict: dict) -> dict:
+    for key, value in over_dict.items():
+        if key in base_dict and isinstance(base_dict[key], dict) and isinstance(value, dict):
+            base_dict[key] = legacy_merge_simple_recursive(base_dict[key], value)
+        else:
+            base_dict[key] = value
+    return base_dict
+
+
+def legacy_merge_complex_recursive(base_dict: dict, over_dict: dict) -> dict:
+    merged_dict = {}
+    for key in set(base_dict) | set(over_dict):
+        if key in base_dict and key in over_dict:
+            if isinstance(base_dict[key], list) and isinstance(over_dict[key], list):
+                merged_dict[key] = base_dict[key] + over_dict[key]
+            elif isinstance(base_dict[key], dict) and isinstance(over_dict[key], dict):
+                merged_dict[key] = legacy_merge_simple_recursive(
+                    copy.deepcopy(base_dict[key]), over_dict[key]
+                )
+            else:
+                merged_dict[key] = over_dict[key]
+        elif key in base_dict:
+            merged_dict[key] = copy.deepcopy(base_dict[key])
+        else:
+            merged_dict[key] = copy.deepcopy(over_dict[key])
+    return merged_dict
+
+
+def legacy_remove_none_recursive(_dict: dict) -> dict:
+    if isinstance(_dict, dict):
+        for key, value in list(_dict.items()):
+            if isinstance(value, (list, dict, tuple, set)):
+                _dict[key] = legacy_remove_none_recursive(value)
+            elif value is None or key is None:
+                del _dict[key]
+
+    elif isinstance(_dict, (list, set, tuple)):
+        _dict = type(_dict)(
+            legacy_remove_none_recursive(item) for item in _dict if item is not None
+        )
+
+    return _dict
+
+
+def wide_tree(nodes: int, leaf: any) -> dict:
+    """Balanced tree of dicts with the given amount of nodes, some leaves being None"""
+    root = {}
+    pending = [root]
+    created = 1
+    while created < nodes:
+        node = pending.pop(0)
+        for index in range(BRANCHING):
+            if created >= nodes:
+                break
+            created += 1
+            if created % 3 == 0:
+                node[f"k{index}"] = {}
+                pending.append(node[f"k{index}"])
+            else:
+                node[f"k{index}"] = None if created % 7 == 0 else leaf
+        if not pending:
+            pending.append(node)
+    return root
+
+
+def deep_tree(nodes: int, leaf: any) -> dict:
+    """Chain of nested dicts with the given amount of nodes"""
+    root = {}
+    node = root
+    for _ in range(nodes - 2):
+        node["child"] = {}
+        node = node["child"]
+    node["leaf"] = leaf
+    node["void"] = None
+    return root
+
+
+def measure(function, *args) -> str:
+    start = time.perf_counter()
+    try:
+        function(*args)
+    except RecursionError:
+        return "RecursionError"
+    return f"{time.perf_counter() - start:.4f}s"
+
+
+def run(nodes: int) -> None:
+    for shape, builder in (("wide", wide_tree), ("deep", deep_tree)):
+        results = {
+            "merge": (
+                measure(
+                    legacy_merge_complex_recursive, builder(nodes, "a"), builder(nodes, "b")
+                ),
+                measure(
+                    Dictionary._merge_complex_recursive,
+                    builder(nodes, "a"),
+                    builder(nodes, "b")
+                ),
+            ),
+            "merge (share=True)": (
+                "-",
+                measure(Dictionary._merge_shared, builder(nodes, "a"), builder(nodes, "b")),
+            ),
+            "remove_none": (
+                measure(legacy_remove_none_recursive, builder(nodes, "a")),
+                measure(Dictionary._remove_none_in_place, builder(nodes, "a")),
+            ),
+        }
+        for operation, (legacy, current) in results.items():
+            print(f"{nodes:>9} {shape:<5} {operation:<20} {legacy:>16} {current:>16}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the Dictionary tree algorithms")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10000, 1000000])
+    arguments = parser.parse_args()
+
+    print(f"{'nodes':>9} {'shape':<5} {'operation':<20} {'recursive':>16} {'iterative':>16}")
+    for amount in arguments.nodes:
+        run(amount)
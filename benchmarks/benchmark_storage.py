@@ -0,0 +1,70 @@
+"""
+Benchmark of the Storage YAML backends
+
+Compares the load and dump times of the pure Python YAML loader and dumper
+    against the libyaml ones (when PyYAML was built with them), over generated
+    storage files of the given sizes in MB.
+
+    $ poetry run python benchmarks/benchmark_storage.py --sizes 1 10 100
+"""
+from pyxavi import Storage
+import argparse
+import tempfile
+import time
+import yaml
+import os
+
+BACKENDS = {"python": (yaml.SafeLoader, yaml.SafeDumper)}
+if yaml.__with_libyaml__:
+    BACKENDS["libyaml"] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+
+def entry(index: int) -> dict:
+    """A storage entry similar to the ones kept by the Queue and the dedup storages"""
+    return {
+        "url": f"https://www.example.com/blog/{index}",
+        "title": f"Post number {index}",
+        "tags": ["news", "tech", str(index % 10)],
+        "published": index % 2 == 0,
+        "visits": index,
+    }
+
+
+def content_for_size(megabytes: float) -> dict:
+    """Generates a content that dumps to approximately the given size"""
+    sample = {f"key_{index}": entry(index) for index in range(100)}
+    bytes_per_entry = len(yaml.dump(sample, Dumper=yaml.SafeDumper)) / len(sample)
+    entries = int(megabytes * 1024 * 1024 / bytes_per_entry)
+    return {f"key_{index}": entry(index) for index in range(entries)}
+
+
+def measure(function, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(megabytes: float, directory: str) -> None:
+    content = content_for_size(megabytes)
+    for backend, (loader, dumper) in BACKENDS.items():
+        filename = os.path.join(directory, f"storage_{megabytes}_{backend}.yaml")
+        with open(filename, "w") as stream:
+            _, dump_time = measure(yaml.dump, content, stream, Dumper=dumper)
+        with open(filename, "r") as stream:
+            _, load_time = measure(yaml.load, stream, Loader=loader)
+        size = os.path.getsize(filename) / 1024 / 1024
+        print(
+            f"{megabytes:>8} {size:>10.2f} {backend:<8} {load_time:>10.4f}s {dump_time:>10.4f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the Storage YAML backends")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 100])
+    arguments = parser.parse_args()
+
+    print(f"Storage backend in use: {Storage.yaml_backend()}")
+    print(f"{'size MB':>8} {'file MB':>10} {'backend':<8} {'load':>11} {'dump':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in arguments.sizes:
+            run(size, directory)
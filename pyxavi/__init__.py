@@ -3,8 +3,16 @@
 from .terminal_color import TerminalColor  # noqa: F401
 from .debugger import dd, traceback, full_stack  # noqa: F401
 from .dictionary import Dictionary  # noqa: F401
+from .config_snapshot import ConfigSnapshot, FrozenDict  # noqa: F401
+from .storage_backend import StorageBackendProtocol  # noqa: F401
 from .storage import Storage  # noqa: F401
+from .config_schema import ConfigSchema, ConfigField, ConfigValidationError  # noqa: F401
 from .config import Config  # noqa: F401
+from .layered_config import LayeredConfig  # noqa: F401
+from .journaled_storage import JournaledStorage  # noqa: F401
+from .lazy_dict import LazyDict  # noqa: F401
+from .sqlite_storage import SqliteStorage  # noqa: F401
+from .mapped_storage import MappedStorage  # noqa: F401
 from .logger import Logger, PIDTimedRotateFileHandler, PIDFileHandler  # noqa: F401
 from .media import Media  # noqa: F401
 from .queue_stack import Queue, QueueItemProtocol, SimpleQueueItem  # noqa: F401
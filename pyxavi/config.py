@@ -1,6 +1,53 @@
-from pyxavi import Dictionary, Storage
+from __future__ import annotations
+from pyxavi import Dictionary, Storage, ConfigSnapshot
+from pyxavi.env_overlay import env_overlay, ENV_SEPARATOR
+from pyxavi.config_schema import ConfigSchema, ConfigValues
+from collections import namedtuple
+import threading
 import os
 
+DEFAULT_WATCH_INTERVAL = 1.0
+
+ParseCacheInfo = namedtuple("ParseCacheInfo", ["hits", "misses", "currsize"])
+
+# Process-wide cache of the parsed config files: {realpath: (signature, content)}.
+#   Keeping only the last version of every file invalidates the changed ones.
+_parse_cache = {}
+_parse_cache_lock = threading.Lock()
+_parse_cache_stats = {"hits": 0, "misses": 0}
+
+
+def file_signature(filename: str) -> tuple:
+    """
+    Returns what identifies a version of the file: (mtime_ns, size, inode)
+
+    A replaced file gets a new inode even with the same mtime and size.
+    Returns None if the file can't be stat'ed.
+    """
+    try:
+        file_stat = os.stat(filename)
+    except OSError:
+        return None
+    return (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+
+
+class _ConfigSource:
+    """A file or a dict merged into the Config, in order. Never modified once built"""
+
+    __slots__ = ("filename", "content", "signature", "name")
+
+    def __init__(
+        self,
+        filename: str = None,
+        content: dict = None,
+        signature: tuple = None,
+        name: str = None
+    ) -> None:
+        self.filename = filename
+        self.content = content
+        self.signature = signature
+        self.name = name if name is not None else filename
+
 
 class Config(Storage):
     """Class to handle a config file
@@ -8,6 +55,26 @@ class Config(Storage):
     It inherits from the Storage class but denying all
     writes. It is a read-only class.
 
+    It can reload itself when the config file or any file added with
+    merge_from_file() changes: reload_if_changed() stats the files and only
+    re-parses the changed ones, then swaps in the new content at once and
+    calls the callbacks registered with add_reload_callback(). start_watching()
+    does it from a background thread every interval seconds.
+
+    The parsed files are kept in a process-wide cache by their real path and
+    stat signature, so constructing several Config of the same file parses it
+    once. Every instance gets its own copy of the cached tree, which is cheaper
+    than parsing it again.
+
+    The content is frozen, so the merges can share it. delete(), remove_none(),
+    initialise_recursive() and the non-sharing merge() still work: the first of
+    them gives the Config its own copy of the content to change (see thaw()).
+    The params given at init or to merge_from_dict() are copied.
+
+    A ConfigSchema given at init (or later to validate()) checks the types,
+    defaults and required keys once, reporting all the errors together. Then
+    get_typed() returns the validated values without any further check.
+
     :Authors:
         Xavier Arnaus <xavi@arnaus.net>
 
@@ -15,7 +82,9 @@ class Config(Storage):
 
     _avoid_load_data_from_file: bool = False
 
-    def __init__(self, filename: str = None, params: dict = None) -> None:
+    def __init__(
+        self, filename: str = None, params: dict = None, schema: ConfigSchema = None
+    ) -> None:
 
         if filename is None and params is None:
             raise RuntimeError("Both [filename] and [params] parameters can't be None")
@@ -27,6 +96,14 @@ class Config(Storage):
             self._avoid_load_data_from_file = True
             filename = "FAKE.yaml"
 
+        self._sources = []
+        self._reload_lock = threading.Lock()
+        self._reload_callbacks = []
+        self._watch_thread = None
+        self._watch_stopping = threading.Event()
+        self._watch_error = None
+        self._values = None
+
         # Now we're ready to initialise by the parent class.
         #   read_file() will be called!
         super().__init__(filename=filename)
@@ -36,25 +113,241 @@ class Config(Storage):
             # pre-initialise the content in case it's None
             self.merge_from_dict(parameters=params)
 
+        # The content is read-only from now on,
+        #   so further merges can share the untouched subtrees
+        #   and the lookups can use the flat index of paths.
+        self.freeze()
+        self.enable_index()
+
+        if schema is not None:
+            self.validate(schema)
+
     def read_file(self) -> None:
         if self._avoid_load_data_from_file:
-            self._content = {}
-            return
-
-        if os.path.exists(self._filename):
-            self._content = super()._load_file_contents(self._filename)
+            self._sources = []
+        elif os.path.exists(self._filename):
+            content, signature = self._load_parsed(self._filename)
+            self._sources = [_ConfigSource(self._filename, content, signature)]
         else:
             raise RuntimeError(f"Config file [{self._filename}] not found")
 
+        self._apply_sources()
+
+    def _merge_sources(self) -> dict:
+        """Returns the merge of all the sources, in order"""
+        content = None
+        for source in self._sources:
+            content = source.content if content is None\
+                else Dictionary._merge_shared(content, source.content or {})
+        return content if content is not None else {}
+
+    def _apply_sources(self) -> None:
+        """Replaces the content by the merge of the sources, at once"""
+        content = self._merge_sources()
+        # Readers see either the whole previous content or the whole new one
+        with self._lock:
+            self._content_changed()
+            self._content = content
+            # The content shares the sources again
+            self._frozen = True
+            self._saved_generation = self._generation
+
+    def _ensure_not_frozen(self) -> None:
+        # Copy on write: changing the content in place needs a private copy first
+        if self._frozen:
+            self.thaw()
+
     def merge_from_dict(self, parameters: dict) -> None:
-        self.merge(Dictionary(parameters))
+        """
+        Merges the given parameters over the current ones.
+
+        The parameters are copied, so changing them afterwards
+            does not change the Config.
+        """
+        parameters = Dictionary._copy_tree(parameters)
+        self.merge(Dictionary(parameters), share=True)
+        self._sources.append(_ConfigSource(content=parameters))
 
     def merge_from_file(self, filename: str) -> None:
         if os.path.exists(filename):
-            self.merge_from_dict(parameters=super()._load_file_contents(filename))
+            parameters, signature = self._load_parsed(filename)
+            self.merge(Dictionary(parameters), share=True)
+            self._sources.append(_ConfigSource(filename, parameters, signature))
         else:
             raise RuntimeError(f"Config file [{filename}] not found")
 
+    def merge_from_env(
+        self, prefix: str, environ: dict = None, separator: str = ENV_SEPARATOR
+    ) -> None:
+        """
+        Merges the environment variables with the given prefix over the current values
+
+        PREFIX__DATABASE__PORT=5432 is read as database.port with the int 5432,
+            see env_overlay(). The variables are read once, by this call.
+        """
+        self.merge_from_dict(parameters=env_overlay(prefix, environ, separator))
+
+    def _load_parsed(self, filename: str) -> tuple:
+        """
+        Returns the (content, signature) of the file, through the parse cache
+
+        The content is a copy of the cached tree, owned by the caller.
+            The file is stat'ed before parsing, so a change made meanwhile
+            is parsed again on the next load. Files that can't be stat'ed
+            are parsed without caching.
+        """
+        realpath = os.path.realpath(filename)
+        signature = file_signature(realpath)
+        if signature is None:
+            return self._load_file_contents(filename), None
+
+        with _parse_cache_lock:
+            cached = _parse_cache.get(realpath)
+            if cached is not None and cached[0] == signature:
+                _parse_cache_stats["hits"] += 1
+                return Dictionary._copy_tree(cached[1]), signature
+            _parse_cache_stats["misses"] += 1
+
+        content = self._load_file_contents(filename)
+        with _parse_cache_lock:
+            _parse_cache[realpath] = (signature, content)
+        return Dictionary._copy_tree(content), signature
+
+    @staticmethod
+    def parse_cache_info() -> ParseCacheInfo:
+        """Returns the (hits, misses, currsize) of the process-wide parse cache"""
+        with _parse_cache_lock:
+            return ParseCacheInfo(
+                _parse_cache_stats["hits"], _parse_cache_stats["misses"], len(_parse_cache)
+            )
+
+    @staticmethod
+    def clear_parse_cache() -> None:
+        """Empties the process-wide parse cache and resets its statistics"""
+        with _parse_cache_lock:
+            _parse_cache.clear()
+            _parse_cache_stats["hits"] = 0
+            _parse_cache_stats["misses"] = 0
+
+    def add_reload_callback(self, callback) -> None:
+        """Registers a callback(config) called after every reload"""
+        self._reload_callbacks.append(callback)
+
+    def remove_reload_callback(self, callback) -> None:
+        self._reload_callbacks.remove(callback)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the content if any of its files changed, by mtime, size or inode
+
+        Costs one stat per file when nothing changed. Only the changed files are
+            parsed again, and the merges are replayed in their original order.
+            If a file can't be loaded, the current content is kept and the error
+            is raised, so the next call tries again.
+
+        Returns if the content was reloaded.
+        """
+        with self._reload_lock:
+            changed = {}
+            for source in self._sources:
+                if source.filename is not None:
+                    signature = file_signature(source.filename)
+                    if signature != source.signature:
+                        changed[id(source)] = signature
+
+            if not changed:
+                return False
+
+            # Build the new list of sources, so nothing changes if a file fails to load
+            sources = []
+            for source in self._sources:
+                if id(source) in changed:
+                    if changed[id(source)] is None:
+                        raise RuntimeError(f"Config file [{source.filename}] not found")
+                    source = _ConfigSource(
+                        source.filename,
+                        self._load_parsed(source.filename)[0],
+                        changed[id(source)],
+                        source.name
+                    )
+                sources.append(source)
+
+            self._sources = sources
+            self._apply_sources()
+
+        for callback in list(self._reload_callbacks):
+            callback(self)
+        return True
+
+    def start_watching(self, interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """Calls reload_if_changed() from a background thread every interval seconds"""
+        if self._watch_thread is not None:
+            return
+
+        self._watch_stopping.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(interval, ),
+            name=f"config-watch-{self._filename}",
+            daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        if self._watch_thread is None:
+            return
+
+        self._watch_stopping.set()
+        self._watch_thread.join()
+        self._watch_thread = None
+
+    def is_watching(self) -> bool:
+        return self._watch_thread is not None
+
+    def close(self) -> None:
+        """Stops watching. There is nothing to flush, as a Config is never written"""
+        self.stop_watching()
+
+    def _watch_loop(self, interval: float) -> None:
+        while not self._watch_stopping.wait(timeout=interval):
+            try:
+                self.reload_if_changed()
+                self._watch_error = None
+            except Exception as e:
+                # Keep watching: a file being edited may be valid on the next poll
+                self._watch_error = e
+
+    def validate(self, schema: ConfigSchema) -> ConfigValues:
+        """
+        Validates the current content against the schema and keeps the values
+
+        A reload does not validate again: call it from a reload callback if needed.
+
+        Raises a ConfigValidationError with all the errors found.
+        """
+        self._values = schema.validate(self)
+        return self._values
+
+    def get_typed(self, param_name: str) -> any:
+        """
+        Returns the validated value of the given schema path, already typed and defaulted
+
+        Raises a RuntimeError if the config was not validated,
+            and a KeyError if the path is not in the schema.
+        """
+        if self._values is None:
+            raise RuntimeError("Config not validated. Give a schema to validate() first")
+        return self._values[param_name]
+
+    def snapshot(self) -> ConfigSnapshot:
+        """
+        Returns an immutable snapshot of the current content
+
+        Unlike the Config itself, nothing in the snapshot can be modified,
+            so it can be shared across threads and processes without copying.
+        """
+        return ConfigSnapshot.from_config(self)
+
     def write_file(self) -> None:
         raise RuntimeError("Config class does not allow writting")
 
@@ -63,3 +356,6 @@ class Config(Storage):
 
     def set_hashed(self, param_name: str, value: any = None):
         raise RuntimeError("Config class does not allow writting")
+
+    def set_hashed_many(self, values: dict, *args, **kwargs):
+        raise RuntimeError("Config class does not allow writting")
@@ -0,0 +1,158 @@
+from __future__ import annotations
+from pyxavi import Dictionary
+from pyxavi.dictionary import compile_path, PATH_SEPARATOR_CHAR, _MISSING
+from pyxavi.env_overlay import coerce_env_value
+from collections.abc import Mapping
+
+SCHEMA_TYPES = (bool, int, float, str, list, dict)
+
+
+class ConfigValidationError(RuntimeError):
+    """Raised with all the errors found while validating a config against a schema
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(self, errors: list) -> None:
+        self.errors = errors
+        report = "\n".join(f"- {error}" for error in errors)
+        super().__init__(f"Config validation failed:\n{report}")
+
+
+class ConfigField:
+    """Declaration of a config value: its type, its default and if it's required
+
+    The value_type is one of SCHEMA_TYPES, or None to accept anything.
+        A missing or None value gets the default, unless it's required.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    __slots__ = ("value_type", "default", "required")
+
+    def __init__(
+        self, value_type: type = None, default: any = None, required: bool = False
+    ) -> None:
+        if value_type is not None and value_type not in SCHEMA_TYPES:
+            raise ValueError(f"Unsupported config field type [{value_type}]")
+        self.value_type = value_type
+        self.default = default
+        self.required = required
+
+    def convert(self, value: any) -> any:
+        """
+        Returns the value as the field type
+
+        Strings are converted like the environment variables (see coerce_env_value()),
+            ints are accepted as floats and 0 and 1 as bools.
+
+        Raises a ValueError if the value is not of the field type.
+        """
+        value_type = self.value_type
+        if value_type is None:
+            return value
+        if value_type is float and isinstance(value, int) and not isinstance(value, bool):
+            return float(value)
+        if value_type is bool and isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, value_type) and\
+           not (value_type is int and isinstance(value, bool)):
+            return value
+        if isinstance(value, str):
+            return coerce_env_value(value, value_type)
+        raise ValueError(f"expected {value_type.__name__}, got {type(value).__name__}")
+
+
+class ConfigValues(Mapping):
+    """Validated config values by path, already converted and with their defaults
+
+    Reading a value is a single dict lookup: no defaults nor type checks.
+        Asking for a path that is not in the schema raises a KeyError.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    __slots__ = ("_values", )
+
+    def __init__(self, values: dict) -> None:
+        self._values = values
+
+    def __getitem__(self, path: str) -> any:
+        return self._values[path]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"ConfigValues({self._values!r})"
+
+
+class ConfigSchema:
+    """Declared types, defaults and required keys of a config, validated at once
+
+    The fields are given as {path: ConfigField}, or {path: type} for optional
+        values without default. The paths are compiled when building the schema.
+
+        schema = ConfigSchema({
+            "database.host": ConfigField(str, required=True),
+            "database.port": ConfigField(int, default=5432),
+            "debug": bool,
+        })
+        values = config.validate(schema)
+        values["database.port"]
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(self, fields: dict, path_separator_char: str = None) -> None:
+        separator = path_separator_char\
+            if path_separator_char is not None else PATH_SEPARATOR_CHAR
+        self._fields = {}
+        for path, field in fields.items():
+            if not isinstance(field, ConfigField):
+                field = ConfigField(field)
+            compiled = compile_path(path, separator)
+            if compiled.needs_resolving:
+                raise ValueError(f"Wildcard paths can't be in a schema [{path}]")
+            self._fields[path] = (compiled, field)
+
+    def get_fields(self) -> dict:
+        """Returns the {path: ConfigField} of the schema"""
+        return {path: field for path, (_, field) in self._fields.items()}
+
+    def validate(self, config: Dictionary) -> ConfigValues:
+        """
+        Validates the given config and returns its values
+
+        Raises a ConfigValidationError with every missing or wrong value found.
+        """
+        values = {}
+        errors = []
+        for path, (compiled, field) in self._fields.items():
+            value = config.get(compiled, _MISSING)
+            if value is _MISSING or value is None:
+                if field.required:
+                    errors.append(f"[{path}] is required")
+                else:
+                    values[path] = field.default
+                continue
+
+            try:
+                values[path] = field.convert(value)
+            except ValueError as e:
+                errors.append(f"[{path}] is invalid: {e}")
+
+        if errors:
+            raise ConfigValidationError(errors)
+        return ConfigValues(values)
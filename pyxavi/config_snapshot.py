@@ -0,0 +1,203 @@
+from __future__ import annotations
+from pyxavi import Dictionary
+from pyxavi.dictionary import CompiledPath, _MISSING
+from collections.abc import Mapping
+
+FREEZABLE_TYPES = (dict, list, tuple, set)
+THAWABLE_TYPES = (Mapping, tuple, frozenset)
+
+
+class FrozenDict(Mapping):
+    """Immutable and hashable mapping
+
+    Wraps a private dict that is never exposed nor modified after building,
+        so it can be read from several threads without any lock. Its values
+        must be hashable as well to hash it, which freeze_tree() ensures.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._data = dict(*args, **kwargs)
+        self._hash = None
+
+    def __getitem__(self, key: any) -> any:
+        return self._data[key]
+
+    def __contains__(self, key: any) -> bool:
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._data.items()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({self._data!r})"
+
+    def __reduce__(self) -> tuple:
+        return (FrozenDict, (self._data, ))
+
+    def get(self, key: any, default: any = None) -> any:
+        return self._data.get(key, default)
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def items(self):
+        return self._data.items()
+
+
+def _rebuild_tree(value: any, container_types: tuple, rebuild) -> any:
+    """
+    Rebuilds the containers of the given tree children first, without recursion
+
+    rebuild(node, converted) must return the new container for the node, where
+        converted(child) returns the already rebuilt child (or the child itself
+        when it's not a container). Subtrees shared in the tree are rebuilt once.
+    """
+    if not isinstance(value, container_types):
+        return value
+
+    # A pre-order walk, so reversing it visits the children before their parents.
+    #   Keeping the nodes here also keeps their ids alive while rebuilding.
+    order = []
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        children = node.values() if isinstance(node, Mapping) else node
+        for child in children:
+            if isinstance(child, container_types):
+                stack.append(child)
+
+    rebuilt = {}
+
+    def converted(child: any) -> any:
+        return rebuilt.get(id(child), child)
+
+    for node in reversed(order):
+        if id(node) not in rebuilt:
+            rebuilt[id(node)] = rebuild(node, converted)
+    return rebuilt[id(value)]
+
+
+def _freeze_node(node: any, converted) -> any:
+    if isinstance(node, dict):
+        return FrozenDict((key, converted(child)) for key, child in node.items())
+    if isinstance(node, set):
+        return frozenset(converted(child) for child in node)
+    return tuple(converted(child) for child in node)
+
+
+def _thaw_node(node: any, converted) -> any:
+    if isinstance(node, Mapping):
+        return {key: converted(child) for key, child in node.items()}
+    if isinstance(node, frozenset):
+        return set(converted(child) for child in node)
+    return [converted(child) for child in node]
+
+
+def freeze_tree(value: any) -> any:
+    """
+    Returns an immutable copy of the given tree
+
+    Dicts become FrozenDict, lists and tuples become tuples and sets become frozensets.
+    """
+    return _rebuild_tree(value, FREEZABLE_TYPES, _freeze_node)
+
+
+def thaw_tree(value: any) -> any:
+    """
+    Returns a mutable copy of the given frozen tree
+
+    FrozenDict become dicts, tuples become lists and frozensets become sets.
+    """
+    return _rebuild_tree(value, THAWABLE_TYPES, _thaw_node)
+
+
+class ConfigSnapshot(Dictionary):
+    """Immutable snapshot of a Config
+
+    The content is turned into FrozenDict and tuples, and every path gets
+        precomputed into the flat index, so a get() is a single hash lookup and
+        nothing can change afterwards: the snapshot can be shared by threads and
+        forked processes without copying nor locking.
+
+    It is hashable and comparable by content, so it can be used as a cache key.
+        get_all() returns the frozen content; to_dict() returns a mutable copy.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    _mapping_types: tuple = (FrozenDict, )
+    _sequence_types: tuple = (tuple, )
+
+    def __init__(self, content: dict = {}, path_separator_char=None) -> None:
+        super().__init__(content=freeze_tree(content), path_separator_char=path_separator_char)
+        self._frozen = True
+
+        # Precompute all the paths, so the lookups never write into the index
+        self.enable_index()
+        self._index_root = self._content
+        if isinstance(self._content, Mapping):
+            for key in self._content:
+                if isinstance(key, str):
+                    self._index[key] = self._build_index_bucket(key)
+
+        self._hash = None
+
+    @staticmethod
+    def from_config(config: Dictionary) -> ConfigSnapshot:
+        """Builds the snapshot of the given Config (or any Dictionary)"""
+        return ConfigSnapshot(config.get_all(), path_separator_char=config._separator)
+
+    def _index_lookup(self, path: CompiledPath) -> any:
+        # Read-only lookup: unknown first-level keys are left for the walk
+        bucket = self._index.get(path.keys[0])
+        return _MISSING if bucket is None else bucket.get(path.path, _MISSING)
+
+    def _ensure_not_frozen(self) -> None:
+        raise RuntimeError("ConfigSnapshot is immutable. Use to_dict() for a mutable copy")
+
+    def thaw(self) -> Dictionary:
+        self._ensure_not_frozen()
+
+    def merge(self, *args, **kwargs) -> Dictionary:
+        self._ensure_not_frozen()
+
+    def disable_index(self) -> Dictionary:
+        self._ensure_not_frozen()
+
+    def to_dict(self) -> dict:
+        """Returns a mutable copy of the content, with lists instead of tuples"""
+        return thaw_tree(self._content)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((self._separator, self._content))
+        return self._hash
+
+    def __eq__(self, other: any) -> bool:
+        if not isinstance(other, ConfigSnapshot):
+            return NotImplemented
+        return self._separator == other._separator and self._content == other._content
+
+    def __reduce__(self) -> tuple:
+        # The index is rebuilt on unpickling rather than transferred
+        return (ConfigSnapshot, (self._content, self._separator))
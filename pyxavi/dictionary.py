@@ -1,9 +1,118 @@
 from __future__ import annotations
 from slugify import slugify
+from functools import lru_cache
+from itertools import islice
 import copy
 
 PATH_SEPARATOR_CHAR = "."
 LIST_HORIZONTAL_RESOLVING_CHAR = "#"
+PATH_CACHE_SIZE = 4096
+SLUGIFY_CACHE_SIZE = 4096
+SCALAR_TYPES = (str, int, float, bool, type(None))
+NONE_CLEANABLE_TYPES = (list, dict, tuple, set)
+_MISSING = object()
+
+
+def _is_int(element: str) -> bool:
+    """Check if the given element is an integer without converting it"""
+    if not element:
+        return False
+    if element[0] in ('-', '+'):
+        return element[1:].isdecimal()
+    return element.isdecimal()
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def slugify_segment(segment: str) -> str:
+    """
+    Returns the slugified version of a single path segment.
+
+    Results are kept in a LRU cache, as slugify is expensive and the same
+        segments (like URLs used as keys) are slugified over and over.
+    """
+    return slugify(segment)
+
+
+def _slugify_path(param_name: str, separator: str) -> str:
+    """
+    Slugifies all the parts from the parameter name.
+
+    The slugify respects the separator for nested keys.
+    It also respects "#" as horizontal list resolving characters.
+    """
+    if param_name.find(LIST_HORIZONTAL_RESOLVING_CHAR) == -1:
+        return separator.join([slugify_segment(part) for part in param_name.split(separator)])
+
+    # We have horizontal resolving chars, so we need to respect them
+    portions = param_name.split(LIST_HORIZONTAL_RESOLVING_CHAR)
+    portions = [
+        separator.join([slugify_segment(part) for part in portion.split(separator)])
+        for portion in portions
+    ]
+    return LIST_HORIZONTAL_RESOLVING_CHAR.join(portions)
+
+
+class CompiledPath:
+    """Pre-parsed param_name path
+
+    Holds the pieces of a param_name path already split by the separator and
+        with the list indexes already converted to int, so the Dictionary
+        accessors don't need to parse the string on every call.
+
+    Instances are immutable and shared through the compile_path() cache,
+        so they must never be modified.
+    """
+
+    __slots__ = (
+        "path",
+        "separator",
+        "segments",
+        "keys",
+        "is_nested",
+        "needs_resolving",
+        "last_key",
+        "parent_path",
+        "_parent",
+    )
+
+    def __init__(self, path: str, separator: str = PATH_SEPARATOR_CHAR) -> None:
+        self.path = path
+        self.separator = separator
+        # A leading separator does not make a nested path, as it always did.
+        self.is_nested = path.find(separator) > 0
+        self.segments = tuple(path.split(separator)) if self.is_nested else (path, )
+        self.keys = tuple(
+            int(segment) if _is_int(segment) else segment for segment in self.segments
+        )
+        self.needs_resolving = path.find(LIST_HORIZONTAL_RESOLVING_CHAR) > -1
+        self.last_key = self.segments[-1]
+        self.parent_path = separator.join(self.segments[:-1]) if self.is_nested else None
+        self._parent = None
+
+    @property
+    def parent(self) -> CompiledPath:
+        """The CompiledPath of the parent path, compiled on first use"""
+        if self._parent is None and self.is_nested:
+            self._parent = compile_path(self.parent_path, self.separator, False)
+        return self._parent
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_path(
+    param_name: str,
+    separator: str = PATH_SEPARATOR_CHAR,
+    slugify_param_name: bool = False
+) -> CompiledPath:
+    """
+    Returns the CompiledPath for the given param_name path.
+
+    Results are kept in a LRU cache keyed by (param_name, separator, slugify_param_name),
+        so repeated lookups of the same path skip the string parsing and the slugify.
+    """
+    if slugify_param_name:
+        param_name = _slugify_path(param_name, separator)
+
+    return CompiledPath(param_name, separator)
 
 
 class Dictionary:
@@ -29,7 +138,13 @@ class Dictionary:
     - merge
     - initialize_recursive
     - resolve_wildcards
+    - iter_matches
     - needs_resolving
+    - freeze
+    - thaw
+    - enable_index
+    - disable_index
+    - compile_path
 
 
     :Authors:
@@ -37,16 +152,201 @@ class Dictionary:
 
     """
 
-    def __init__(self, content: dict = {}, path_separator_char=None) -> None:
+    # The container types walked by the read accessors
+    _mapping_types: tuple = (dict, )
+    _sequence_types: tuple = (list, )
+
+    def __init__(
+        self, content: dict = {}, path_separator_char=None, use_index: bool = False
+    ) -> None:
         self._content = content
         self._separator = path_separator_char\
             if path_separator_char is not None else PATH_SEPARATOR_CHAR
+        self._frozen = False
+        self._index = None
+        self._index_root = None
+        if use_index:
+            self.enable_index()
 
     def _is_int(self, element: str) -> bool:
         """Check if the given element is an integer without converting it"""
-        if element[0] in ('-', '+'):
-            return element[1:].isdecimal()
-        return element.isdecimal()
+        return _is_int(element)
+
+    def _compile(self, param_name: str, slugify_param_name: bool = False) -> CompiledPath:
+        """
+        Returns the cached CompiledPath for the given param_name
+
+        An already compiled param_name is returned as is, as it was already
+            slugified when compiled if needed.
+
+        Raises a ValueError if it was compiled for another separator.
+        """
+        if isinstance(param_name, CompiledPath):
+            if param_name.separator != self._separator:
+                raise ValueError(
+                    f"The path [{param_name.path}] was compiled for the separator " +
+                    f"[{param_name.separator}] but this object uses [{self._separator}]"
+                )
+            return param_name
+        return compile_path(param_name, self._separator, slugify_param_name)
+
+    def compile_path(self, param_name: str, slugify_param_name: bool = False) -> CompiledPath:
+        """
+        Returns the param_name path already parsed and slugified if asked
+
+        The result can be given as param_name to the accessors like get(), set(),
+            key_exists() or delete(), so repeated calls skip the parsing and the
+            slugify, for example when working with URLs as keys.
+        """
+        return self._compile(param_name, slugify_param_name)
+
+    def freeze(self) -> Dictionary:
+        """
+        Forbids any in-place change of the content
+
+        Needed to safely share subtrees with other objects (see merge() with share=True):
+            set, delete, initialise_recursive, remove_none and non-sharing merges
+            will raise a RuntimeError until thaw() is called.
+        """
+        self._frozen = True
+        return self
+
+    def thaw(self) -> Dictionary:
+        """
+        Allows again in-place changes of the content
+
+        The content is deep-copied first so it does not share anything anymore.
+        """
+        if self._frozen:
+            self._content_changed()
+            self._content = Dictionary._copy_tree(self._content)
+            self._frozen = False
+        return self
+
+    def is_frozen(self) -> bool:
+        """Returns if the content is frozen for in-place changes"""
+        return self._frozen
+
+    def _ensure_not_frozen(self) -> None:
+        """Raises a RuntimeError if the content is frozen"""
+        if self._frozen:
+            raise RuntimeError("Dictionary is frozen. Call thaw() before modifying it")
+
+    def enable_index(self) -> Dictionary:
+        """
+        Keeps a flat index of the full paths to their values, for read-mostly content
+
+        The index is built lazily, one first-level key at a time, so a get() or a
+            key_exists() of a nested path becomes a single hash lookup. The set,
+            delete, merge, initialise_recursive and remove_none calls invalidate
+            only the first-level keys they touch.
+
+        Changes made directly into the returned objects are not seen by the index,
+            so call disable_index() before doing so.
+        """
+        if self._index is None:
+            self._index = {}
+            self._index_root = None
+        return self
+
+    def disable_index(self) -> Dictionary:
+        """Drops the flat index, so every lookup walks the content again"""
+        self._index = None
+        self._index_root = None
+        return self
+
+    def is_indexed(self) -> bool:
+        """Returns if the flat index is enabled"""
+        return self._index is not None
+
+    def _content_changed(self, first_keys: list = None) -> None:
+        """
+        Hook called before any change of the content
+
+        Invalidates the index for the given first-level keys, or all of it if None.
+        """
+        if self._index is None:
+            return
+        if first_keys is None:
+            self._index.clear()
+        else:
+            for key in first_keys:
+                self._index.pop(key, None)
+
+    def _index_lookup(self, path: CompiledPath) -> any:
+        """
+        Returns the indexed value for the given nested compiled path
+
+        Returns _MISSING when the index can't answer, so the caller walks the content.
+
+        The content can be swapped by another thread meanwhile (like a Config reload),
+            so the bucket is built from the content read at the start and only kept
+            if that content is still the current one.
+        """
+        content = self._content
+        index = self._index
+        if self._index_root is not content:
+            # The content was replaced as a whole, like in read_file(). A new index
+            #   dict keeps any lookup still running on the previous one out of it.
+            index = self._index = {}
+            self._index_root = content
+
+        first_key = path.keys[0]
+        if not isinstance(first_key, str) or not isinstance(content, self._mapping_types):
+            return _MISSING
+
+        bucket = index.get(first_key)
+        if bucket is None:
+            bucket = self._build_index_bucket(first_key, content)
+            if self._content is content:
+                index[first_key] = bucket
+        return bucket.get(path.path, _MISSING)
+
+    def _build_index_bucket(self, first_key: str, content: dict = None) -> dict:
+        """
+        Flattens the subtree under the given first-level key into {full path: value}
+
+        Only the keys that a path walk would reach by the same string are indexed:
+            dict keys that are strings, not int-like and without the separator,
+            and list positions. Anything else is left for the walk.
+        The content defaults to the current one.
+        """
+        if content is None:
+            content = self._content
+        bucket = {}
+        separator = self._separator
+        mapping_types, sequence_types = self._mapping_types, self._sequence_types
+        container_types = mapping_types + sequence_types
+        stack = [(first_key, content.get(first_key))]
+        while stack:
+            prefix, node = stack.pop()
+            if isinstance(node, mapping_types):
+                children = [
+                    (key, value) for key, value in node.items()
+                    if isinstance(key, str) and separator not in key and not _is_int(key)
+                ]
+            elif isinstance(node, sequence_types):
+                children = enumerate(node)
+            else:
+                continue
+
+            for key, value in children:
+                child_path = f"{prefix}{separator}{key}"
+                bucket[child_path] = value
+                if isinstance(value, container_types):
+                    stack.append((child_path, value))
+        return bucket
+
+    @staticmethod
+    def clear_path_cache() -> None:
+        """Empties the caches of compiled paths and slugified segments of all instances"""
+        compile_path.cache_clear()
+        slugify_segment.cache_clear()
+
+    @staticmethod
+    def slugify_cache_info() -> tuple:
+        """Returns the (hits, misses, maxsize, currsize) of the slugified segments cache"""
+        return slugify_segment.cache_info()
 
     def get(
         self, param_name: str = "", default_value: any = None, slugify_param_name=False
@@ -57,21 +357,28 @@ class Dictionary:
 
         Accepts wildcards for the list indexes.
         """
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
+        path = self._compile(param_name, slugify_param_name)
+
+        if path.needs_resolving:
+            return self._get_horizontally(param_name=path.path, default_value=default_value)
 
-        if Dictionary.needs_resolving(param_name=param_name):
-            return self._get_horizontally(param_name=param_name, default_value=default_value)
+        return self._get_compiled(path, default_value)
+
+    def _get_compiled(self, path: CompiledPath, default_value: any = None) -> any:
+        """Returns the value found in the given non-wildcard compiled path"""
+        if path.is_nested:
+            if self._index is not None:
+                value = self._index_lookup(path)
+                if value is not _MISSING:
+                    return default_value if value is None else value
 
-        if param_name.find(self._separator) > 0:
             # bring it local so we can play with it
             local_content = self._content
-            for item in param_name.split(self._separator):
+            for item in path.keys:
 
-                if self._is_int(item):
+                if isinstance(item, int):
                     # It's an int, so it's meant to be the key of a list
-                    item = int(item)
-
-                    if isinstance(local_content, list) and\
+                    if isinstance(local_content, self._sequence_types) and\
                        item < len(local_content) and\
                        local_content[item] is not None:
                         # If exists and is not None we keep digging
@@ -91,8 +398,8 @@ class Dictionary:
             return local_content
 
         # In the case of a single item param_name, get directly from the content.
-        return self._content[param_name] \
-            if self._content and param_name in self._content \
+        return self._content[path.path] \
+            if self._content and path.path in self._content \
             else default_value
 
     def get_all(self) -> dict:
@@ -107,86 +414,65 @@ class Dictionary:
         except IndexError:
             return True
 
-    def __recursive_set(self, param_name: str, value: any, dictionary: any = None) -> None:
+    def _set_compiled(self, path: CompiledPath, value: any = None) -> None:
         """
-        Recursively walks through the dictionary to find the key to set, and sets it
+        Walks through the dictionary following the compiled path and sets the value
 
         Raises a RuntimeError if any of the keys in the param_name does not exist
         Raises a ValueError if a key from the param_name is an index but the parent is
             not a list.
         """
-        if param_name.find(self._separator) > 0:
-            pieces = param_name.split(self._separator)
-            if self._is_int(pieces[0]):
-                item = int(pieces[0])
-
-                # The dictionary argument must be a list. Complain otherwise.
+        dictionary = self._content
+        last_position = len(path.keys) - 1
+        for position in range(last_position):
+            item = path.keys[position]
+            if isinstance(item, int):
+                # The dictionary must be a list. Complain otherwise.
                 if not isinstance(dictionary, list):
                     raise ValueError(
-                        f"With the key [{param_name}] I expect the parent to be a list," +
+                        f"With the key [{path.path}] I expect the parent to be a list," +
                         f" but its [{type(dictionary)}]"
                     )
 
                 if item < len(dictionary) and dictionary[item] is not None:
-                    self.__recursive_set(
-                        param_name=self._separator.join(pieces[1:]),
-                        value=value,
-                        dictionary=dictionary[item]
-                    )
+                    dictionary = dictionary[item]
                 else:
                     raise RuntimeError(
                         f"Dictionary path [{item}] is out of bounds for [{dictionary}]"
                     )
             elif isinstance(dictionary, dict):
-                # The dictionary argument is a dict
-
                 # Now, the key may not exists.
-                if pieces[0] not in dictionary:
+                if item not in dictionary:
                     # This is a set(), if the key doesn't exist, we create it as an empty dict
                     # This should solve the issue of setting into non-existing root paths
-                    dictionary[pieces[0]] = {}
-
-                # if pieces[0] not in dictionary:
-                #     raise RuntimeError(
-                #         f"Dictionary key [{pieces[0]}] is unknown in [{dictionary}]"
-                #     )
+                    dictionary[item] = {}
 
-                self.__recursive_set(
-                    param_name=self._separator.join(pieces[1:]),
-                    value=value,
-                    dictionary=dictionary[pieces[0]]
-                )
+                dictionary = dictionary[item]
             else:
-                # The dictionary argument is anything but a list or a dict
-                raise RuntimeError(f"Dictionary path [{param_name}] unknown in [{dictionary}]")
-        else:
-            if self._is_int(param_name):
-                # It's an int, so it's meant to be the key of a list
-                param_name = int(param_name)
-
-                # The dictionary must be a list. Complain otherwise.
-                if not isinstance(dictionary, list):
-                    raise ValueError(
-                        f"With the key [{param_name}] I expect the parent to be a list," +
-                        f" but its [{type(dictionary)}]"
-                    )
+                # The dictionary is anything but a list or a dict
+                remaining = path.separator.join(path.segments[position:])
+                raise RuntimeError(f"Dictionary path [{remaining}] unknown in [{dictionary}]")
+
+        item = path.keys[last_position]
+        if isinstance(item, int):
+            # It's an int, so it's meant to be the key of a list.
+            #   The dictionary must be a list. Complain otherwise.
+            if not isinstance(dictionary, list):
+                raise ValueError(
+                    f"With the key [{item}] I expect the parent to be a list," +
+                    f" but its [{type(dictionary)}]"
+                )
 
-                if param_name < len(dictionary):
-                    # Normal set. Possibly an overwrite.
-                    dictionary[param_name] = value
-                else:
-                    # So it is an append or a set out of bounds
-                    #   Let's fill with None until the desired index
-                    for idx in range(0, param_name + 1):
-                        if not self._is_out_of_range(idx, dictionary):
-                            continue
-                        else:
-                            dictionary.append(value if idx == param_name else None)
+            if item < len(dictionary):
+                # Normal set. Possibly an overwrite.
+                dictionary[item] = value
             else:
-                if dictionary is not None:
-                    dictionary[param_name] = value
-                else:
-                    dictionary = {param_name: value}
+                # So it is an append or a set out of bounds
+                #   Let's fill with None until the desired index
+                dictionary.extend([None] * (item - len(dictionary)))
+                dictionary.append(value)
+        elif dictionary is not None:
+            dictionary[item] = value
 
     def set(self, param_name: str, value: any = None, slugify_param_name=False) -> None:
         """
@@ -206,33 +492,46 @@ class Dictionary:
         if param_name is None:
             raise RuntimeError("Params must have a name")
 
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
+        self._ensure_not_frozen()
 
-        if Dictionary.needs_resolving(param_name=param_name):
-            return self._set_horizontally(param_name=param_name, value=value)
+        path = self._compile(param_name, slugify_param_name)
+
+        if path.needs_resolving:
+            self._content_changed(
+                None if LIST_HORIZONTAL_RESOLVING_CHAR in
+                path.segments[0] else [path.segments[0]]
+            )
+            return self._set_horizontally(param_name=path.path, value=value)
 
-        self.__recursive_set(param_name=param_name, value=value, dictionary=self._content)
+        self._content_changed([path.segments[0]])
+        self._set_compiled(path, value)
 
     def key_exists(self, param_name: str, slugify_param_name=False) -> bool:
         """
         Checks if the given param_name path exists,
         including the indexes inside the list ranges
         """
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
+        return self._key_exists_compiled(self._compile(param_name, slugify_param_name))
+
+    def _key_exists_compiled(self, path: CompiledPath) -> bool:
+        """Checks if the given compiled path exists"""
+        if self._index is not None and path.is_nested and not path.needs_resolving:
+            if self._index_lookup(path) is not _MISSING:
+                return True
 
-        key_to_search = self.get_last_key(param_name=param_name)
-        parent_object = self.get_parent(param_name)
+        key_to_search = path.last_key
+        parent_object = self._get_parent_compiled(path)
 
         if parent_object is None:
             return False
 
-        if isinstance(parent_object, list) and self._is_int(key_to_search):
+        if isinstance(parent_object, self._sequence_types) and _is_int(key_to_search):
             if self._is_out_of_range(int(key_to_search), parent_object):
                 return False
             else:
                 return True
 
-        if isinstance(parent_object, dict):
+        if isinstance(parent_object, self._mapping_types):
             return True if key_to_search in parent_object else False
 
         return False
@@ -241,17 +540,17 @@ class Dictionary:
         """
         Returns the last key of the param_name
         """
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
-
-        return param_name.split(self._separator)[-1]\
-            if param_name.find(self._separator) > 0 else param_name
+        return self._compile(param_name, slugify_param_name).last_key
 
     def get_parent_path(self, param_name: str, slugify_param_name=False) -> str:
         """
         Returns the all the path without the last key of the param_name
         """
+        if isinstance(param_name, CompiledPath):
+            return self._compile(param_name).parent_path
+
         if slugify_param_name:
-            param_name = ".".join([slugify(part) for part in param_name.split(".")])
+            param_name = ".".join([slugify_segment(part) for part in param_name.split(".")])
 
         return self._separator.join(param_name.split(self._separator)[:-1])\
             if param_name.find(self._separator) > 0 else None
@@ -262,15 +561,15 @@ class Dictionary:
 
         Accepts wildcards for the list indexes.
         """
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
+        return self._get_parent_compiled(self._compile(param_name, slugify_param_name))
 
-        if Dictionary.needs_resolving(param_name=param_name):
-            return self._get_parent_horizontally(param_name=param_name)
+    def _get_parent_compiled(self, path: CompiledPath) -> dict:
+        """Returns the parent object of the given compiled path"""
+        if path.needs_resolving:
+            return self._get_parent_horizontally(param_name=path.path)
 
-        if param_name.find(self._separator) > 0:
-            pieces = param_name.split(self._separator)
-            parent_key = self._separator.join(pieces[:-1])
-            return self.get(param_name=parent_key, default_value=None)
+        if path.is_nested:
+            return self._get_compiled(path.parent, None)
         else:
             return self._content
 
@@ -278,15 +577,18 @@ class Dictionary:
         """
         Deletes the given param_name path key
         """
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
+        self._ensure_not_frozen()
 
-        if self.key_exists(param_name=param_name):
-            parent = self.get_parent(param_name=param_name)
-            key_to_delete = self.get_last_key(param_name=param_name)
+        path = self._compile(param_name, slugify_param_name)
 
-            if isinstance(parent, list) and self._is_int(key_to_delete):
+        if self._key_exists_compiled(path):
+            parent = self._get_parent_compiled(path)
+            key_to_delete = path.last_key
+
+            if isinstance(parent, list) and _is_int(key_to_delete):
                 key_to_delete = int(key_to_delete)
 
+            self._content_changed([path.segments[0]])
             del parent[key_to_delete]
             return True
         else:
@@ -299,6 +601,7 @@ class Dictionary:
         Raises RuntimeError if a key of the param_name path already exists and it's not
             a dictionary or a list (whatever expected), to avoid overwriting.
         """
+        self._ensure_not_frozen()
 
         param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
 
@@ -332,7 +635,7 @@ class Dictionary:
         else:
             obj = self._content
 
-        if isinstance(obj, dict):
+        if isinstance(obj, self._mapping_types):
             return [key for key in obj.keys()]
         if isinstance(obj, list) or isinstance(obj, tuple) or isinstance(obj, set):
             return [key for key in range(len(obj))]
@@ -347,7 +650,8 @@ class Dictionary:
         self,
         origin: Dictionary,
         param_name: str = None,
-        slugify_param_name=False
+        slugify_param_name=False,
+        share: bool = False
     ) -> Dictionary:
         """
         Takes a given Dictionary object and merges it into the current object
@@ -358,13 +662,37 @@ class Dictionary:
             - It will be added if it's a list
             - It will be overwritten otherwise
 
+        With share=True the result is built by structural sharing: only the dicts
+            and lists along the merged paths are copied, and every untouched subtree
+            is shared with the previous content and with the origin. Nothing
+            existing is modified, so it is allowed at root even when frozen.
+            Both this object and the origin are frozen afterwards, so neither can
+            change the shared subtrees in place: thaw() gives back a private copy.
+            The dicts given to the origin must not be modified directly either.
+
         Returns the merged Dictionary object.
 
         Raises a RuntimeError if any of the keys in the param_name does not exist
         """
+        if param_name is None and share:
+            # The untouched subtrees are shared, so only the merged keys get invalidated
+            indexed = self._index_root is self._content
+            self._content_changed(list(origin.get_all()))
+            self._content = Dictionary._merge_shared(self._content, origin.get_all())
+            if indexed:
+                self._index_root = self._content
+            self.freeze()
+            origin.freeze()
+            return self
+
+        self._ensure_not_frozen()
+        merge_function = Dictionary._merge_shared if share\
+            else Dictionary._merge_complex_recursive
+
         if param_name is None:
             # self._content = {**self._content, **origin.get_all()}
-            self._content = Dictionary._merge_complex_recursive(self._content, origin.get_all())
+            self._content_changed()
+            self._content = merge_function(self._content, origin.get_all())
         else:
             param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
 
@@ -376,7 +704,7 @@ class Dictionary:
                 # self.set(param_name=param_name, value={**current_value, **origin.get_all()})
                 self.set(
                     param_name=param_name,
-                    value=Dictionary._merge_complex_recursive(current_value, origin.get_all())
+                    value=merge_function(current_value, origin.get_all())
                 )
             elif isinstance(current_value, list):
                 current_value.append(origin.get_all())
@@ -384,16 +712,53 @@ class Dictionary:
             else:
                 self.set(param_name=param_name, value=origin.get_all())
 
+        if share:
+            self.freeze()
+            origin.freeze()
+
         return self
 
+    @staticmethod
+    def _copy_tree(value: any) -> any:
+        """
+        Deep copy of the nested dicts and lists, walking them without recursion
+
+        Any other value is deep-copied as usual.
+        """
+        if not isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+
+        copied_root = {} if isinstance(value, dict) else []
+        stack = [(value, copied_root)]
+        while stack:
+            original, copied = stack.pop()
+            children = original.items() if isinstance(original, dict) else enumerate(original)
+            for key, child in children:
+                if isinstance(child, (dict, list)):
+                    copied_child = {} if isinstance(child, dict) else []
+                    stack.append((child, copied_child))
+                elif isinstance(child, SCALAR_TYPES):
+                    copied_child = child
+                else:
+                    copied_child = copy.deepcopy(child)
+
+                if isinstance(copied, dict):
+                    copied[key] = copied_child
+                else:
+                    copied.append(copied_child)
+        return copied_root
+
     @staticmethod
     def _merge_simple_recursive(base_dict: dict, over_dict: dict) -> dict:
-        for key, value in over_dict.items():
-            if key in base_dict and isinstance(base_dict[key], dict) and isinstance(value,
-                                                                                    dict):
-                base_dict[key] = Dictionary._merge_simple_recursive(base_dict[key], value)
-            else:
-                base_dict[key] = value
+        """Merges over_dict into base_dict in place. Walks the dicts without recursion"""
+        stack = [(base_dict, over_dict)]
+        while stack:
+            base, over = stack.pop()
+            for key, value in over.items():
+                if key in base and isinstance(base[key], dict) and isinstance(value, dict):
+                    stack.append((base[key], value))
+                else:
+                    base[key] = value
         return base_dict
 
     @staticmethod
@@ -405,34 +770,139 @@ class Dictionary:
                     merged_dict[key] = base_dict[key] + over_dict[key]
                 elif isinstance(base_dict[key], dict) and isinstance(over_dict[key], dict):
                     merged_dict[key] = Dictionary._merge_simple_recursive(
-                        copy.deepcopy(base_dict[key]), over_dict[key]
+                        Dictionary._copy_tree(base_dict[key]), over_dict[key]
                     )
                 else:
                     merged_dict[key] = over_dict[key]
             elif key in base_dict:
-                merged_dict[key] = copy.deepcopy(base_dict[key])
+                merged_dict[key] = Dictionary._copy_tree(base_dict[key])
             else:
-                merged_dict[key] = copy.deepcopy(over_dict[key])
+                merged_dict[key] = Dictionary._copy_tree(over_dict[key])
         return merged_dict
 
-    def remove_none(self) -> None:
-        self._content = self._remove_none_recursive(self._content)
-
-    def _remove_none_recursive(self, _dict: dict) -> dict:
-        """Delete None values recursively from all of the dictionaries, tuples, lists, sets"""
-        if isinstance(_dict, dict):
-            for key, value in list(_dict.items()):
-                if isinstance(value, (list, dict, tuple, set)):
-                    _dict[key] = self._remove_none_recursive(value)
-                elif value is None or key is None:
-                    del _dict[key]
-
-        elif isinstance(_dict, (list, set, tuple)):
-            _dict = type(_dict)(
-                self._remove_none_recursive(item) for item in _dict if item is not None
+    @staticmethod
+    def _merge_shared(base_dict: dict, over_dict: dict) -> dict:
+        """
+        Same merge as _merge_complex_recursive() but by structural sharing
+
+        Returns a new dict that shares every untouched subtree with both sides,
+            copying only the dicts along the paths present in over_dict.
+        """
+        merged_dict = dict(base_dict)
+        for key, value in over_dict.items():
+            if key in merged_dict:
+                if isinstance(merged_dict[key], list) and isinstance(value, list):
+                    merged_dict[key] = merged_dict[key] + value
+                elif isinstance(merged_dict[key], dict) and isinstance(value, dict):
+                    merged_dict[key] = Dictionary._merge_simple_shared(merged_dict[key], value)
+                else:
+                    merged_dict[key] = value
+            else:
+                merged_dict[key] = value
+        return merged_dict
+
+    @staticmethod
+    def _merge_simple_shared(base_dict: dict, over_dict: dict) -> dict:
+        """Returns a shallow-copied base_dict with over_dict merged, without recursion"""
+        merged_dict = dict(base_dict)
+        stack = [(merged_dict, over_dict)]
+        while stack:
+            merged, over = stack.pop()
+            for key, value in over.items():
+                if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
+                    # Copy only the dicts we are going to write into
+                    merged[key] = dict(merged[key])
+                    stack.append((merged[key], value))
+                else:
+                    merged[key] = value
+        return merged_dict
+
+    def remove_none(self) -> int:
+        """
+        Deletes None values from all of the dictionaries, tuples, lists, sets
+
+        Dicts, lists and sets are cleaned in place. Only the tuples holding
+            a None (or an already rebuilt tuple) are rebuilt.
+
+        Returns the amount of pruned entries.
+        """
+        self._ensure_not_frozen()
+        self._content_changed()
+        self._content, pruned = Dictionary._remove_none_in_place(self._content)
+        return pruned
+
+    @staticmethod
+    def _remove_none_in_place(_dict: any) -> tuple:
+        """
+        Deletes None values in place, walking the tree with an explicit stack
+
+        Returns a tuple with the cleaned root (which is the same object
+            unless it's a tuple that had to be rebuilt) and the pruned amount.
+        """
+        pruned = 0
+        if not isinstance(_dict, NONE_CLEANABLE_TYPES):
+            return _dict, pruned
+
+        # Tuples can't be cleaned in place, so they are rebuilt afterwards, children first.
+        #   Keeping them here also keeps their ids alive while rebuilding.
+        tuples = [(_dict, None, None)] if isinstance(_dict, tuple) else []
+        stack = [_dict]
+        while stack:
+            node = stack.pop()
+
+            if isinstance(node, dict):
+                doomed = None
+                for key, value in node.items():
+                    if isinstance(value, NONE_CLEANABLE_TYPES):
+                        stack.append(value)
+                        if isinstance(value, tuple):
+                            tuples.append((value, node, key))
+                    elif value is None or key is None:
+                        if doomed is None:
+                            doomed = []
+                        doomed.append(key)
+                if doomed is not None:
+                    for key in doomed:
+                        del node[key]
+                    pruned += len(doomed)
+                continue
+
+            if isinstance(node, list) and None in node:
+                # Compact the list in place
+                position = 0
+                for item in node:
+                    if item is not None:
+                        node[position] = item
+                        position += 1
+                pruned += len(node) - position
+                del node[position:]
+            elif isinstance(node, set) and None in node:
+                node.discard(None)
+                pruned += 1
+
+            for key, item in enumerate(node):
+                if isinstance(item, NONE_CLEANABLE_TYPES):
+                    stack.append(item)
+                    if isinstance(item, tuple):
+                        tuples.append((item, node, key))
+
+        rebuilt = {}
+        for original, parent, key in reversed(tuples):
+            if None not in original and not any(id(item) in rebuilt for item in original):
+                continue
+
+            new_tuple = type(original)(
+                rebuilt.get(id(item), item) for item in original if item is not None
             )
+            pruned += len(original) - len(new_tuple)
+            rebuilt[id(original)] = new_tuple
+            if isinstance(parent, set):
+                parent.discard(original)
+                parent.add(new_tuple)
+            elif isinstance(parent, (dict, list)):
+                parent[key] = new_tuple
 
-        return _dict
+        return rebuilt.get(id(_dict), _dict), pruned
 
     @staticmethod
     def needs_resolving(param_name: str) -> bool:
@@ -446,54 +916,113 @@ class Dictionary:
         Returns a list of all resolved paths.
         Non matching paths are ignored.
         """
-        param_name = self._slugify_param_name_if_needed(param_name, slugify_param_name)
+        path = self._compile(param_name, slugify_param_name)
 
         # do we actually need to do anything?
-        if not Dictionary.needs_resolving(param_name):
-            return [param_name]
-
-        # Initialise what we'll return
-        returning_stack = []
+        if not path.needs_resolving:
+            return [path.path]
 
-        # Get the portions between the '#' and clean them (to avoid starting or ending with ".")
-        portions = param_name.split(LIST_HORIZONTAL_RESOLVING_CHAR)
-        portions = [
-            portion.removeprefix(PATH_SEPARATOR_CHAR).removesuffix(PATH_SEPARATOR_CHAR)
-            for portion in portions
+        return [
+            path.separator.join([str(key) for key in resolved_keys])
+            for resolved_keys, _, _ in self._walk_wildcards(path)
         ]
 
-        # Now just strip and return the first one
-        portion = portions.pop(0)
-        keys_in_portion = self.get_keys_in(portion)
-
-        # Now check the keys in portion.
-        #   If none here, simply the param_name is wrong
-        if keys_in_portion is None:
-            return []
-
-        # And walk through all iterations in that list.
-        #   Because it MUST be a list
-        for key in keys_in_portion:
-            path = f"{portion}{PATH_SEPARATOR_CHAR}{key}"
-
-            portions_path = f"{PATH_SEPARATOR_CHAR}"
-            portions_path = f"{portions_path}{LIST_HORIZONTAL_RESOLVING_CHAR}"
-            portions_path = f"{portions_path}{PATH_SEPARATOR_CHAR}"
-            portions_path = portions_path.join(portions)
-            if portions_path:
-                path = f"{path}{PATH_SEPARATOR_CHAR}{portions_path}"
-
-            if Dictionary.needs_resolving(path):
-                # We still have more "#", go deeper.
-                returning_stack = returning_stack + self.resolve_wildcards(param_name=path)
-            else:
-                # No more "#"
-                if self.key_exists(path):
-                    # just return the value of the whole path only if the key exists
-                    returning_stack.append(path)
+    def iter_matches(
+        self, param_name: str = "", limit: int = None, slugify_param_name: bool = False
+    ):
+        """
+        Lazily yields a (path, value) tuple for every path matching param_name
+
+        It follows the resolve_wildcards() semantics, but the tree is only walked
+            as far as the consumer iterates, so breaking out of the loop or
+            giving a limit stops the walk without visiting the rest of the tree.
+        A param_name without wildcards yields itself only if the key exists.
+        """
+        path = self._compile(param_name, slugify_param_name)
+
+        if not path.needs_resolving:
+            if (limit is None or limit > 0) and self._key_exists_compiled(path):
+                parent = self._get_parent_compiled(path)
+                key = int(path.last_key
+                          ) if isinstance(parent, self._sequence_types) else path.last_key
+                yield path.path, parent[key]
+            return
+
+        matches = (
+            (path.separator.join([str(key) for key in resolved_keys]), parent[key])
+            for resolved_keys, parent, key in self._walk_wildcards(path)
+        )
+        yield from matches if limit is None else islice(matches, limit)
+
+    def _walk_wildcards(self, path: CompiledPath):
+        """
+        Walks the content once following the given compiled wildcard path
 
-        # And finally we return all paths that we resolved in this iteration.
-        return returning_stack
+        A '#' key matches every index of a list or every key of a dict.
+        Yields a tuple (resolved_keys, parent, key) for every matching final key,
+            in the order of the content, so the value is parent[key].
+        Intermediate None values and non-container values are not walked into.
+        """
+        keys = path.keys
+        mapping_types, sequence_types = self._mapping_types, self._sequence_types
+        last_position = len(keys) - 1
+        # Every frame holds the position in the path and a lazy iterator of the
+        #   (resolved_keys, node) pairs to visit at that position.
+        stack = [(0, iter((((), self._content), )))]
+        while stack:
+            position, nodes = stack[-1]
+            entry = next(nodes, None)
+            if entry is None:
+                stack.pop()
+                continue
+
+            resolved_keys, node = entry
+            item = keys[position]
+
+            if position == last_position:
+                # Final key: it only needs to exist, whatever its value is.
+                if item == LIST_HORIZONTAL_RESOLVING_CHAR:
+                    if isinstance(node, mapping_types):
+                        for key in node:
+                            yield resolved_keys + (key, ), node, key
+                    elif isinstance(node, sequence_types):
+                        for key in range(len(node)):
+                            yield resolved_keys + (key, ), node, key
+                elif isinstance(item, int):
+                    if isinstance(node,
+                                  sequence_types) and not self._is_out_of_range(item, node):
+                        yield resolved_keys + (item, ), node, item
+                    elif isinstance(node, mapping_types) and path.segments[position] in node:
+                        key = path.segments[position]
+                        yield resolved_keys + (key, ), node, key
+                elif isinstance(node, mapping_types) and item in node:
+                    yield resolved_keys + (item, ), node, item
+                continue
+
+            # Intermediate key: we need something to dig into.
+            if item == LIST_HORIZONTAL_RESOLVING_CHAR:
+                if isinstance(node, mapping_types):
+                    children = node.items()
+                elif isinstance(node, sequence_types):
+                    children = enumerate(node)
+                else:
+                    continue
+                stack.append((position + 1, self._walkable_children(resolved_keys, children)))
+            elif isinstance(item, int):
+                if isinstance(node,
+                              sequence_types) and item < len(node) and node[item] is not None:
+                    stack.append(
+                        (position + 1, iter(((resolved_keys + (item, ), node[item]), )))
+                    )
+            elif isinstance(node, mapping_types) and item in node and node[item] is not None:
+                stack.append((position + 1, iter(((resolved_keys + (item, ), node[item]), ))))
+
+    @staticmethod
+    def _walkable_children(resolved_keys: tuple, children):
+        """Lazily yields the (resolved_keys, node) pairs of the non-None children"""
+        for key, value in children:
+            if value is not None:
+                yield resolved_keys + (key, ), value
 
     def _get_horizontally(self, param_name: str = "", default_value: any = None) -> list:
         """
@@ -502,13 +1031,10 @@ class Dictionary:
 
         It will ignore non-existing or not matching param_name path portions.
         """
-        all_param_names = self.resolve_wildcards(param_name=param_name)
-
-        returning_stack = []
-        for path in all_param_names:
-            returning_stack.append(self.get(param_name=path, default_value=default_value))
-
-        return returning_stack
+        return [
+            parent[key] if parent[key] is not None else default_value
+            for _, parent, key in self._walk_wildcards(self._compile(param_name))
+        ]
 
     def _set_horizontally(self, param_name: str, value: any = None):
         """
@@ -517,10 +1043,13 @@ class Dictionary:
 
         It will ignore non-existing or not matching param_name path portions.
         """
-        all_param_names = self.resolve_wildcards(param_name=param_name)
+        # Resolve everything before writing, so we never alter what we're walking
+        matches = [
+            (parent, key) for _, parent, key in self._walk_wildcards(self._compile(param_name))
+        ]
 
-        for path in all_param_names:
-            self.set(param_name=path, value=value)
+        for parent, key in matches:
+            parent[key] = value
 
     def _get_parent_horizontally(self, param_name: str = "", default_value: any = None) -> list:
         """
@@ -529,13 +1058,7 @@ class Dictionary:
 
         It will ignore non-existing or not matching param_name path portions.
         """
-        all_param_names = self.resolve_wildcards(param_name=param_name)
-
-        returning_stack = []
-        for path in all_param_names:
-            returning_stack.append(self.get_parent(param_name=path))
-
-        return returning_stack
+        return [parent for _, parent, _ in self._walk_wildcards(self._compile(param_name))]
 
     def _slugify_param_name_if_needed(
         self, param_name: str, slugify_param_name: bool = False
@@ -546,18 +1069,10 @@ class Dictionary:
         The slugify respects dots as separators for nested keys.
         It also respects "#" as horizontal list resolving characters.
         """
+        if isinstance(param_name, CompiledPath):
+            return self._compile(param_name).path
+
         if not slugify_param_name:
             return param_name
 
-        if not Dictionary.needs_resolving(param_name):
-            return self._separator.join(
-                [slugify(part) for part in param_name.split(self._separator)]
-            )
-
-        # We have horizontal resolving chars, so we need to respect them
-        portions = param_name.split(LIST_HORIZONTAL_RESOLVING_CHAR)
-        portions = [
-            self._separator.join([slugify(part) for part in portion.split(self._separator)])
-            for portion in portions
-        ]
-        return LIST_HORIZONTAL_RESOLVING_CHAR.join(portions)
+        return self._compile(param_name, slugify_param_name).path
@@ -0,0 +1,120 @@
+from __future__ import annotations
+import json
+import os
+
+ENV_SEPARATOR = "__"
+ENV_TRUE_VALUES = ("true", "yes", "on")
+ENV_FALSE_VALUES = ("false", "no", "off")
+# JSON is only tried for the values that look like JSON containers or strings
+ENV_JSON_STARTS = ("[", "{", "\"")
+
+
+def coerce_env_value(value: str, value_type: type = None) -> any:
+    """
+    Converts the given environment variable value
+
+    Without a value_type, the type is guessed: "true"/"yes"/"on" and
+        "false"/"no"/"off" become bool, then int, then float, then JSON
+        for lists, dicts and quoted strings, otherwise it stays a string.
+    With a value_type (bool, int, float, str, list or dict) it must convert to it:
+        bool also accepts "1" and "0", and list and dict are read as JSON.
+
+    Raises a ValueError if the value can't be converted to the given value_type.
+    """
+    if value_type is None:
+        return _guess_env_value(value)
+
+    if value_type is str:
+        return value
+    if value_type is bool:
+        lowered = value.strip().lower()
+        if lowered in ENV_TRUE_VALUES or lowered == "1":
+            return True
+        if lowered in ENV_FALSE_VALUES or lowered == "0":
+            return False
+        raise ValueError(f"Value [{value}] is not a bool")
+    if value_type in (int, float):
+        return value_type(value)
+    if value_type in (list, dict):
+        try:
+            converted = json.loads(value)
+        except ValueError:
+            raise ValueError(f"Value [{value}] is not a JSON {value_type.__name__}")
+        if not isinstance(converted, value_type):
+            raise ValueError(f"Value [{value}] is not a JSON {value_type.__name__}")
+        return converted
+
+    raise ValueError(f"Can't convert environment values to [{value_type}]")
+
+
+def _guess_env_value(value: str) -> any:
+    lowered = value.strip().lower()
+    if lowered in ENV_TRUE_VALUES:
+        return True
+    if lowered in ENV_FALSE_VALUES:
+        return False
+
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    # Avoid turning words like "nan" or "infinity" into floats
+    if any(character.isdigit() for character in value):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+
+    if value.lstrip().startswith(ENV_JSON_STARTS):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+
+    return value
+
+
+def env_overlay(
+    prefix: str,
+    environ: dict = None,
+    separator: str = ENV_SEPARATOR,
+    lowercase_keys: bool = True,
+    coerce: bool = True
+) -> dict:
+    """
+    Returns the environment variables with the given prefix as a nested dict
+
+    PREFIX__DATABASE__PORT=5432 becomes {"database": {"port": 5432}}: the name
+        is split by the separator into the path, lowercased unless asked not to,
+        and the value is coerced by coerce_env_value().
+    The environ defaults to os.environ, read at the time of the call.
+
+    Variables with empty segments are ignored. When both a path and a deeper
+        one are given (PREFIX__A and PREFIX__A__B), the deeper one wins.
+    """
+    environ = os.environ if environ is None else environ
+    start = f"{prefix}{separator}"
+
+    variables = []
+    for name, value in environ.items():
+        if not name.startswith(start):
+            continue
+        segments = name[len(start):].split(separator)
+        if not all(segments):
+            continue
+        if lowercase_keys:
+            segments = [segment.lower() for segment in segments]
+        variables.append((segments, value))
+
+    # Shallower first, so the deeper paths replace them
+    variables.sort(key=lambda variable: len(variable[0]))
+
+    overlay = {}
+    for segments, value in variables:
+        node = overlay
+        for segment in segments[:-1]:
+            if not isinstance(node.get(segment), dict):
+                node[segment] = {}
+            node = node[segment]
+        node[segments[-1]] = coerce_env_value(value) if coerce else value
+    return overlay
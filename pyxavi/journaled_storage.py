@@ -0,0 +1,272 @@
+from __future__ import annotations
+from pyxavi import Dictionary, Storage
+from pyxavi.storage import DURABILITY_FILE, DURABILITY_NONE, HASH_SHA256, hash_key
+from pyxavi.storage import DEFAULT_BLAKE2B_DIGEST_SIZE
+from hashlib import blake2b
+import json
+import os
+
+JOURNAL_SUFFIX = ".journal"
+DEFAULT_JOURNAL_MAX_SIZE = 1024 * 1024
+JOURNAL_DIGEST_SIZE = 16
+
+# Journal records, one JSON list per line. Not all of them are idempotent (deleting
+#   a list item shifts the rest), so a journal must only be replayed over the snapshot
+#   it was written against. Its first record holds the digest of that snapshot file:
+#   after a compaction the file changes, so a journal left behind is skipped.
+RECORD_BASE = "b"
+RECORD_SET = "s"
+RECORD_SET_KEY = "k"
+RECORD_DELETE = "d"
+RECORD_INITIALISE = "i"
+RECORD_REMOVE_NONE = "r"
+
+
+class JournaledStorage(Storage):
+    """Storage that appends every change to a journal instead of rewriting the file
+
+    Every set, delete, merge, initialise_recursive and remove_none is appended as a
+    compact record to the journal file (the filename plus ".journal"), so the cost of
+    a change is proportional to the change and not to the whole content.
+
+    read_file() loads the file as a snapshot and replays the journal over it.
+    write_file() only syncs the journal, until it grows past journal_max_size bytes:
+    then the content is compacted into the file and the journal is emptied. The journal
+    starts with the digest of the file it applies to, so a journal left behind by a crash
+    between both steps is not replayed over the compacted file.
+
+    The journal is JSON, so the values must be JSON types: tuples come back as lists
+    and the keys of the dicts as strings. A value that can't be journaled forces the
+    compaction on the next write_file().
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(
+        self,
+        filename,
+        path_separator_char=None,
+        backend: any = None,
+        durability: str = DURABILITY_FILE,
+        journal_max_size: int = DEFAULT_JOURNAL_MAX_SIZE,
+        autosave_interval: float = None,
+        autosave_mutations: int = None
+    ) -> None:
+        self._journal_filename = f"{filename}{JOURNAL_SUFFIX}"
+        self._journal_max_size = journal_max_size
+        self._journal_stream = None
+        self._journal_size = 0
+        self._journal_needs_compaction = False
+        # Digest of the snapshot file the journal applies to
+        self._snapshot_digest = None
+        # While above 0 the changes are not journaled: replaying, or inside another change
+        self._journal_suspended = 0
+
+        super().__init__(
+            filename=filename,
+            path_separator_char=path_separator_char,
+            backend=backend,
+            durability=durability,
+            autosave_interval=autosave_interval,
+            autosave_mutations=autosave_mutations
+        )
+
+    def read_file(self) -> None:
+        with self._lock:
+            self._close_journal()
+            super().read_file()
+            self._snapshot_digest = self._read_snapshot_digest()
+            self._replay_journal()
+            self._saved_generation = self._generation
+
+    def _replay_journal(self) -> None:
+        """
+        Applies the journal records over the loaded content
+
+        A crash while appending may leave an incomplete last record:
+            it's ignored and cut from the journal. A journal written against
+            another snapshot (a crash right after a compaction) is emptied.
+        """
+        self._journal_size = 0
+        if not os.path.exists(self._journal_filename):
+            return
+
+        self._journal_suspended += 1
+        try:
+            with open(self._journal_filename, 'rb') as stream:
+                for line in stream:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record[0] == RECORD_BASE:
+                        if self._journal_size == 0 and record[1] != self._snapshot_digest:
+                            # Already compacted into the file
+                            break
+                    else:
+                        self._apply_record(record)
+                    self._journal_size += len(line)
+        finally:
+            self._journal_suspended -= 1
+
+        if os.path.getsize(self._journal_filename) > self._journal_size:
+            os.truncate(self._journal_filename, self._journal_size)
+
+    def _apply_record(self, record: list) -> None:
+        operation = record[0]
+        if operation == RECORD_SET:
+            self.set(record[1], record[2])
+        elif operation == RECORD_SET_KEY:
+            self._content_changed([record[1]])
+            self._content[record[1]] = record[2]
+        elif operation == RECORD_DELETE:
+            self.delete(record[1])
+        elif operation == RECORD_INITIALISE:
+            self.initialise_recursive(record[1])
+        elif operation == RECORD_REMOVE_NONE:
+            self.remove_none()
+        else:
+            raise RuntimeError(f"Unknown journal record [{operation}]")
+
+    def _journal(self, record: list) -> None:
+        """Appends the record to the journal, unless it's suspended"""
+        if self._journal_suspended:
+            return
+
+        try:
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+        except (TypeError, ValueError):
+            # Can't be journaled, so it must get into the file by a compaction
+            self._journal_needs_compaction = True
+            return
+
+        if self._journal_size == 0:
+            line = json.dumps([RECORD_BASE, self._snapshot_digest], separators=(",", ":")) +\
+                "\n" + line
+        if self._journal_stream is None:
+            self._journal_stream = open(self._journal_filename, 'a', encoding="utf-8")
+        self._journal_stream.write(line)
+        self._journal_stream.flush()
+        self._journal_size += len(line.encode("utf-8"))
+
+    def _read_snapshot_digest(self) -> str:
+        try:
+            with open(self._filename, 'rb') as stream:
+                return blake2b(stream.read(), digest_size=JOURNAL_DIGEST_SIZE).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def _close_journal(self) -> None:
+        if self._journal_stream is not None:
+            self._journal_stream.close()
+            self._journal_stream = None
+
+    def set(self, param_name: str, value: any = None, slugify_param_name=False) -> None:
+        with self._lock:
+            if param_name is None:
+                return super().set(param_name, value)
+
+            path = self._compile(param_name, slugify_param_name)
+            result = super().set(path, value)
+            self._journal([RECORD_SET, path.path, value])
+            return result
+
+    def delete(self, param_name: str, slugify_param_name=False) -> None:
+        with self._lock:
+            path = self._compile(param_name, slugify_param_name)
+            deleted = super().delete(path)
+            if deleted:
+                self._journal([RECORD_DELETE, path.path])
+            return deleted
+
+    def initialise_recursive(self, param_name: str, slugify_param_name=False) -> None:
+        with self._lock:
+            path = self._compile(param_name, slugify_param_name)
+            self._journal_suspended += 1
+            try:
+                super().initialise_recursive(path.path)
+            finally:
+                self._journal_suspended -= 1
+            self._journal([RECORD_INITIALISE, path.path])
+
+    def merge(
+        self,
+        origin: Dictionary,
+        param_name: str = None,
+        slugify_param_name=False,
+        share: bool = False
+    ) -> Dictionary:
+        with self._lock:
+            self._journal_suspended += 1
+            try:
+                super().merge(origin, param_name, slugify_param_name, share)
+            finally:
+                self._journal_suspended -= 1
+
+            # Merges concatenate lists, so the merged results are journaled instead
+            if param_name is None:
+                for key in origin.get_all():
+                    self._journal([RECORD_SET_KEY, key, self._content[key]])
+            else:
+                path = self._compile(param_name, slugify_param_name)
+                self._journal([RECORD_SET, path.path, self.get(path)])
+            return self
+
+    def remove_none(self) -> int:
+        with self._lock:
+            pruned = super().remove_none()
+            if pruned > 0:
+                self._journal([RECORD_REMOVE_NONE])
+            return pruned
+
+    def set_hashed_many(
+        self,
+        values: dict,
+        hash_algorithm: str = HASH_SHA256,
+        digest_size: int = DEFAULT_BLAKE2B_DIGEST_SIZE
+    ) -> None:
+        with self._lock:
+            super().set_hashed_many(values, hash_algorithm, digest_size)
+            for param_name, value in values.items():
+                self._journal(
+                    [RECORD_SET_KEY, hash_key(param_name, hash_algorithm, digest_size), value]
+                )
+
+    def write_file(self) -> None:
+        """
+        Makes the journal durable, compacting it into the file when it's too big
+        """
+        if self._journal_needs_compaction or self._journal_size >= self._journal_max_size:
+            self.compact()
+            return
+
+        with self._lock:
+            generation = self._generation
+            if self._journal_stream is not None and self._durability != DURABILITY_NONE:
+                os.fsync(self._journal_stream.fileno())
+            self._saved_generation = generation
+
+    def compact(self) -> None:
+        """Writes the whole content into the file and empties the journal"""
+        with self._write_lock:
+            with self._lock:
+                generation = self._generation
+                self._write_file_contents(
+                    self._filename, self._content, self._backend, self._durability
+                )
+                # From now on the journal does not apply, even if emptying it fails
+                self._snapshot_digest = self._read_snapshot_digest()
+                self._close_journal()
+                if os.path.exists(self._journal_filename):
+                    os.truncate(self._journal_filename, 0)
+                self._journal_size = 0
+                self._journal_needs_compaction = False
+                self._saved_generation = generation
+
+    def close(self) -> None:
+        super().close()
+        self._close_journal()
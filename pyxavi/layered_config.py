@@ -0,0 +1,257 @@
+from __future__ import annotations
+from pyxavi import Dictionary, Config
+from pyxavi.config import _ConfigSource
+from pyxavi.dictionary import CompiledPath, compile_path, _MISSING
+from pyxavi.env_overlay import env_overlay, ENV_SEPARATOR
+from pyxavi.config_schema import ConfigSchema
+import os
+
+PARAMS_LAYER_NAME = "params"
+ENV_LAYER_NAME = "env"
+
+# Outcomes of looking up a path in a single layer
+_FOUND = 0
+# A dict in the path lacks the key: the layers below may still have it
+_NOT_FOUND = 1
+# Something in the path is not a dict: it hides the layers below
+_HIDDEN = 2
+
+
+class LayeredConfig(Config):
+    """Config that keeps its files and dicts as separate layers
+
+    Instead of merging every file or dict into one tree, each one is kept as
+    a layer on top of the previous ones: the config file, then the params, then
+    every merge_from_file(), merge_from_dict(), merge_from_env() or add_layer().
+    add_layer() copies nothing, only the params and merge_from_dict() are copied.
+
+    get() and key_exists() resolve the path through the layers from the top
+    down, and remember the result until a layer changes. The result is the
+    same as the merge made by Config: dicts are merged, the first-level lists
+    are concatenated and anything else is overridden by the upper layers.
+    get_layer_for() tells which layer supplied a value.
+
+    The merged tree is only built when something needs the whole content,
+    like get_all(), a wildcard path or snapshot().
+
+    Unlike Config, nothing is changed in place: delete(), remove_none(),
+    initialise_recursive() and thaw() raise a RuntimeError, as a private copy
+    would drop the layers and their reloads. Add a layer on top instead.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(
+        self, filename: str = None, params: dict = None, schema: ConfigSchema = None
+    ) -> None:
+        # {path: (value, layer position)}, emptied when the layers change
+        self._resolved = {}
+        self._materialised = None
+
+        super().__init__(filename=filename, params=params, schema=schema)
+
+        if params is not None:
+            self._sources[-1] = _ConfigSource(
+                content=self._sources[-1].content, name=PARAMS_LAYER_NAME
+            )
+
+    @property
+    def _content(self) -> dict:
+        content = self._materialised
+        if content is None:
+            content = self._materialised = self._merge_sources()
+        return content
+
+    @_content.setter
+    def _content(self, content: dict) -> None:
+        # Replacing the whole content (like Storage does at init) leaves it as the only layer
+        self._sources = [_ConfigSource(content=content)]
+        self._resolved = {}
+        self._materialised = content
+
+    def _apply_sources(self) -> None:
+        with self._lock:
+            self._content_changed()
+            self._materialised = None
+            self._frozen = True
+            self._saved_generation = self._generation
+
+    def _content_changed(self, first_keys: list = None) -> None:
+        self._resolved = {}
+        super()._content_changed(first_keys)
+
+    def _ensure_not_frozen(self) -> None:
+        raise RuntimeError("LayeredConfig can't be changed in place. Add a layer instead")
+
+    def thaw(self) -> Dictionary:
+        self._ensure_not_frozen()
+
+    def enable_index(self) -> Dictionary:
+        # The resolved paths are already remembered, the index would build the merged tree
+        return self
+
+    def add_layer(self, content: dict, name: str = None) -> None:
+        """
+        Puts the given dict as a new layer on top of the others
+
+        The dict is not copied, so it must not be modified afterwards.
+            Without a name, the layer is named after its position, like "layer-2".
+        """
+        with self._lock:
+            if name is None:
+                name = f"layer-{len(self._sources)}"
+            self._sources.append(_ConfigSource(content=content, name=name))
+            self._apply_sources()
+
+    def add_file_layer(self, filename: str, name: str = None) -> None:
+        """Puts the given file as a new layer on top of the others, watched for reloads"""
+        if not os.path.exists(filename):
+            raise RuntimeError(f"Config file [{filename}] not found")
+
+        content, signature = self._load_parsed(filename)
+        with self._lock:
+            self._sources.append(_ConfigSource(filename, content, signature, name))
+            self._apply_sources()
+
+    def merge_from_dict(self, parameters: dict) -> None:
+        """Adds a copy of the given parameters as a new layer"""
+        self.add_layer(Dictionary._copy_tree(parameters))
+
+    def merge_from_file(self, filename: str) -> None:
+        """Adds the given file as a new layer"""
+        self.add_file_layer(filename)
+
+    def merge_from_env(
+        self, prefix: str, environ: dict = None, separator: str = ENV_SEPARATOR
+    ) -> None:
+        """Adds the environment variables with the given prefix as the "env" layer"""
+        self.add_layer(env_overlay(prefix, environ, separator), name=ENV_LAYER_NAME)
+
+    def merge(
+        self,
+        origin: Dictionary,
+        param_name: str = None,
+        slugify_param_name=False,
+        share: bool = False
+    ) -> Dictionary:
+        if param_name is not None:
+            raise RuntimeError("LayeredConfig only merges at root, as a new layer")
+
+        self.add_layer(origin.get_all())
+        return self
+
+    def get_layer_names(self) -> list:
+        """Returns the names of the layers, from the bottom to the top"""
+        return [source.name for source in self._sources]
+
+    def get_layer_for(self, param_name: str, slugify_param_name=False) -> str:
+        """
+        Returns the name of the top layer that supplies the value of the given path
+
+        For dicts merged from several layers, it's the top one of them.
+        Returns None if the path does not exist.
+
+        Raises a ValueError for wildcard paths.
+        """
+        path = self._compile(param_name, slugify_param_name)
+        if path.needs_resolving:
+            raise ValueError(f"Can't tell the layer of the wildcard path [{path.path}]")
+
+        value, position = self._resolve(path)
+        return None if value is _MISSING else self._sources[position].name
+
+    def _get_compiled(self, path: CompiledPath, default_value: any = None) -> any:
+        value = self._resolve(path)[0]
+        if value is _MISSING or (value is None and path.is_nested):
+            return default_value
+        return value
+
+    def _key_exists_compiled(self, path: CompiledPath) -> bool:
+        if path.needs_resolving:
+            return super()._key_exists_compiled(path)
+        return self._resolve(path)[0] is not _MISSING
+
+    def _resolve(self, path: CompiledPath) -> tuple:
+        """Returns the (value, layer position) of the path, or (_MISSING, None)"""
+        resolved = self._resolved
+        result = resolved.get(path.path)
+        if result is None:
+            result = self._resolve_in_layers(path, self._sources)
+            resolved[path.path] = result
+        return result
+
+    def _resolve_in_layers(self, path: CompiledPath, sources: list) -> tuple:
+        keys = path.keys if path.is_nested else (path.path, )
+        first_level = len(keys) == 1
+
+        found = []
+        for position in range(len(sources) - 1, -1, -1):
+            content = sources[position].content
+            if content is None:
+                continue
+
+            if not first_level and isinstance(content, dict) and\
+               isinstance(content.get(keys[0]), list):
+                # The first-level lists are concatenated, so look into the merged one
+                return self._resolve_in_first_level(path)
+
+            outcome, value, through_list = LayeredConfig._lookup(content, keys)
+            if outcome == _HIDDEN:
+                break
+            if outcome == _NOT_FOUND:
+                continue
+
+            found.append((value, position))
+            if through_list or\
+               not isinstance(value, dict) and not (first_level and isinstance(value, list)):
+                # Overrides anything below. Lists below the first level are not
+                #   merged, so a value inside one comes only from this layer
+                break
+
+        if not found:
+            return _MISSING, None
+
+        # Merge from the bottom up, as Config does
+        value = _MISSING
+        for layer_value, _ in reversed(found):
+            if value is _MISSING:
+                value = layer_value
+            elif first_level and isinstance(value, list) and isinstance(layer_value, list):
+                value = value + layer_value
+            elif isinstance(value, dict) and isinstance(layer_value, dict):
+                value = Dictionary._merge_simple_shared(value, layer_value)
+            else:
+                value = layer_value
+        return value, found[0][1]
+
+    def _resolve_in_first_level(self, path: CompiledPath) -> tuple:
+        first_level, position = self._resolve(compile_path(path.segments[0], self._separator))
+        outcome, value, _ = LayeredConfig._lookup(first_level, path.keys[1:])
+        return (value, position) if outcome == _FOUND else (_MISSING, None)
+
+    @staticmethod
+    def _lookup(content: any, keys: tuple) -> tuple:
+        """
+        Walks the keys in a single layer
+
+        Returns the (outcome, value, if the walk went through a list)
+        """
+        node = content
+        through_list = False
+        for key in keys:
+            if isinstance(key, int):
+                if isinstance(node, list) and key < len(node):
+                    node = node[key]
+                    through_list = True
+                else:
+                    return _HIDDEN, None, through_list
+            elif isinstance(node, dict):
+                if key not in node:
+                    # Inside a list the layers below can't supply it
+                    return (_HIDDEN if through_list else _NOT_FOUND), None, through_list
+                node = node[key]
+            else:
+                return _HIDDEN, None, through_list
+        return _FOUND, node, through_list
@@ -0,0 +1,163 @@
+from __future__ import annotations
+from typing import Protocol
+
+
+class LazyDictSourceProtocol(Protocol):
+    """Where a LazyDict loads its first-level values from"""
+
+    def load(self, key: any) -> any:
+        """Returns the value of the given key. Raises a KeyError if it does not exist"""
+
+    def keys(self):
+        """Returns an iterable of all the existing keys"""
+
+    def items(self):
+        """Returns an iterable of all the existing (key, value) pairs"""
+
+
+class LazyDict(dict):
+    """Dict that loads its values from a source on first access
+
+    Reading or checking a key loads only that key. Anything that needs all of them
+        (iterating, len(), comparing) loads all the missing ones first.
+    The deleted keys are remembered, so they are not loaded again from the
+        source and the owner can remove them from it.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(self, source: LazyDictSourceProtocol) -> None:
+        super().__init__()
+        self._source = source
+        self._deleted = set()
+        self._complete = False
+
+    def __missing__(self, key: any) -> any:
+        if self._complete or key in self._deleted:
+            raise KeyError(key)
+        value = self._source.load(key)
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key: any) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        try:
+            self.__missing__(key)
+            return True
+        except KeyError:
+            return False
+
+    def __setitem__(self, key: any, value: any) -> None:
+        self._deleted.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: any) -> None:
+        if key not in self:
+            raise KeyError(key)
+        dict.__delitem__(self, key)
+        self._deleted.add(key)
+
+    def __iter__(self):
+        self.load_all()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self.load_all()
+        return dict.__len__(self)
+
+    def __bool__(self) -> bool:
+        if dict.__len__(self) > 0:
+            return True
+        if self._complete:
+            return False
+        return any(key not in self._deleted for key in self._source.keys())
+
+    def __eq__(self, other: any) -> bool:
+        self.load_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: any) -> bool:
+        self.load_all()
+        return dict.__ne__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        self.load_all()
+        return dict.__repr__(self)
+
+    def get(self, key: any, default: any = None) -> any:
+        return self[key] if key in self else default
+
+    def setdefault(self, key: any, default: any = None) -> any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: any, *default) -> any:
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self) -> tuple:
+        self.load_all()
+        key, value = dict.popitem(self)
+        self._deleted.add(key)
+        return key, value
+
+    def clear(self) -> None:
+        self.load_all()
+        self._deleted.update(dict.keys(self))
+        dict.clear(self)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def keys(self):
+        self.load_all()
+        return dict.keys(self)
+
+    def values(self):
+        self.load_all()
+        return dict.values(self)
+
+    def items(self):
+        self.load_all()
+        return dict.items(self)
+
+    def copy(self) -> dict:
+        self.load_all()
+        return dict(dict.items(self))
+
+    def load_all(self) -> None:
+        """Loads all the keys not loaded yet from the source"""
+        if self._complete:
+            return
+        for key, value in self._source.items():
+            if key not in self._deleted and not dict.__contains__(self, key):
+                dict.__setitem__(self, key, value)
+        self._complete = True
+
+    def is_loaded(self, key: any) -> bool:
+        """Returns if the given key is loaded, without loading it"""
+        return dict.__contains__(self, key)
+
+    def loaded_keys(self) -> list:
+        """Returns the keys loaded so far, without loading the rest"""
+        return list(dict.keys(self))
+
+    def deleted_keys(self) -> set:
+        """Returns the keys deleted that may still exist in the source"""
+        return set(self._deleted)
+
+    def forget_deleted(self, keys: list) -> None:
+        """Forgets the given deleted keys, once they are removed from the source"""
+        self._deleted.difference_update(keys)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from pyxavi import Dictionary, Storage
+from pyxavi.storage_backend import BinaryBackend, BACKEND_BINARY, BINARY_KIND_SECTIONS
+from collections.abc import Mapping
+import marshal
+import mmap
+import os
+
+
+class MappedSections(Mapping):
+    """Read-only mapping over the sections of a memory-mapped binary storage
+
+    Only the index is parsed when mapping the file: every value is decoded from
+        the mapped pages when its key is accessed. With cache_sections the decoded
+        values are kept, otherwise each access decodes the section again.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(self, data: any, index: dict, data_start: int, cache_sections: bool = True):
+        self._data = data
+        self._index = index
+        self._data_start = data_start
+        self._cache = {} if cache_sections else None
+
+    def __getitem__(self, key: any) -> any:
+        if self._cache is not None and key in self._cache:
+            return self._cache[key]
+
+        offset, size = self._index[key]
+        start = self._data_start + offset
+        value = marshal.loads(self._data[start:start + size])
+        if self._cache is not None:
+            self._cache[key] = value
+        return value
+
+    def __contains__(self, key: any) -> bool:
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"MappedSections({list(self._index)!r})"
+
+    def release(self) -> None:
+        """Releases the view over the mapped file, after which no key can be read"""
+        if isinstance(self._data, memoryview):
+            self._data.release()
+        self._cache = {} if self._cache is not None else None
+
+
+class MappedStorage(Storage):
+    """Read-only Storage that memory-maps a binary storage file
+
+    The file must be in the binary format with a dict content (see compile()).
+        Opening it maps the file and parses only the index of first-level keys,
+        and get() and key_exists() decode only the sections they touch. The pages
+        are shared through the OS page cache, so forked workers mapping the same
+        file don't each hold a parsed copy.
+
+    Any change raises a RuntimeError. A file replaced afterwards (write_file()
+        of a Storage replaces it atomically) is only seen after read_file().
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    _mapping_types: tuple = (dict, MappedSections)
+
+    def __init__(self, filename, path_separator_char=None, cache_sections: bool = True) -> None:
+        self._cache_sections = cache_sections
+        self._mmap = None
+
+        super().__init__(
+            filename=filename, path_separator_char=path_separator_char, backend=BACKEND_BINARY
+        )
+
+    @staticmethod
+    def compile(source: str, destination: str, source_backend: any = None) -> None:
+        """Converts the given storage file into the binary format that can be mapped"""
+        Storage.convert_file(source, destination, source_backend, BACKEND_BINARY)
+
+    def read_file(self) -> None:
+        with self._lock:
+            self._release()
+
+            if os.path.getsize(self._filename) == 0:
+                # Empty files can't be mapped
+                self._content = {}
+                return
+
+            with open(self._filename, 'rb') as stream:
+                self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+            data = memoryview(self._mmap)
+            try:
+                kind, index, data_start = BinaryBackend.read_index(data)
+                if kind != BINARY_KIND_SECTIONS:
+                    raise ValueError("Only a dict content can be mapped")
+            except ValueError as e:
+                data.release()
+                self._release()
+                raise RuntimeError(f"Can't map the storage [{self._filename}]: {e}")
+
+            self._content = MappedSections(data, index, data_start, self._cache_sections)
+
+    def _release(self) -> None:
+        if isinstance(self._content, MappedSections):
+            self._content.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _ensure_not_frozen(self) -> None:
+        raise RuntimeError("MappedStorage is read-only")
+
+    def thaw(self) -> Dictionary:
+        self._ensure_not_frozen()
+
+    def merge(self, *args, **kwargs) -> Dictionary:
+        self._ensure_not_frozen()
+
+    def enable_index(self) -> Dictionary:
+        # The flat index would decode every section of the touched keys
+        raise RuntimeError("MappedStorage does not support the index")
+
+    def write_file(self) -> None:
+        self._ensure_not_frozen()
+
+    def close(self) -> None:
+        """Unmaps the file. Nothing can be read afterwards"""
+        with self._lock:
+            self._release()
+            self._content = {}
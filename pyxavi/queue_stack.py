@@ -1,6 +1,7 @@
 from __future__ import annotations
 from pyxavi import Storage, Dictionary
 from typing import Protocol
+from contextlib import contextmanager
 import logging
 
 
@@ -50,11 +51,13 @@ class Queue:
         self,
         logger: logging.Logger = None,
         storage_file: str = None,
-        queue_item_object: QueueItemProtocol = SimpleQueueItem
+        queue_item_object: QueueItemProtocol = SimpleQueueItem,
+        file_locking: bool = False
     ) -> None:
         self._logger = logger if logger is not None\
             else logging.getLogger(self.DEFAULT_LOGGER_NAME)
         self.__storage_file = storage_file
+        self._file_locking = file_locking
         self._queue_item_object = queue_item_object
         self.load()
 
@@ -62,19 +65,24 @@ class Queue:
         if self.__storage_file is not None:
             # If we have a storage file defined we'll
             #   then have a place to save the state.
-            self._queue_manager = Storage(filename=self.__storage_file)
+            self._queue_manager = Storage(
+                filename=self.__storage_file, file_locking=self._file_locking
+            )
         else:
             # If we don't have a storage file defined we'll
             #   then use a Dictionary and won't allow to save the state
             self._queue_manager = Dictionary({"queue": []})
 
+        self._load_items()
+        return self.length()
+
+    def _load_items(self) -> None:
         self._queue = list(
             map(
                 lambda x: self._queue_item_object.from_dict(x),
                 self._queue_manager.get("queue", [])
             )
         )
-        return self.length()
 
     def append(self, item: QueueItemProtocol) -> None:
         self._queue.append(item)
@@ -106,6 +114,30 @@ class Queue:
                 "This queue has no state and a call to save() is received. Ignoring"
             )
 
+    @contextmanager
+    def transaction(self):
+        """
+        Reloads the queue, lets the block change it and saves it, all under one lock
+
+        With file_locking, several processes can work on the same queue file:
+
+            with queue.transaction():
+                item = queue.pop()
+
+        If the block raises, nothing is saved and the queue is reloaded.
+        """
+        if not isinstance(self._queue_manager, Storage):
+            raise RuntimeError("This queue has no storage file to run a transaction on")
+
+        with self._queue_manager.transaction():
+            self._load_items()
+            try:
+                yield self
+            except BaseException:
+                self._load_items()
+                raise
+            self._queue_manager.set("queue", list(map(lambda x: x.to_dict(), self._queue)))
+
     def is_empty(self) -> bool:
         return False if self._queue else True
 
@@ -0,0 +1,178 @@
+from __future__ import annotations
+from pyxavi import Dictionary, Storage
+from pyxavi.lazy_dict import LazyDict, LazyDictSourceProtocol
+from pyxavi.storage import DURABILITY_NONE, DURABILITY_FILE, DURABILITY_FULL
+from pyxavi.storage_backend import StorageBackendProtocol, BACKEND_PICKLE
+import sqlite3
+
+SQLITE_TABLE = "storage"
+SQLITE_SYNCHRONOUS = {
+    DURABILITY_NONE: "OFF", DURABILITY_FILE: "NORMAL", DURABILITY_FULL: "FULL"
+}
+
+
+class SqliteSource(LazyDictSourceProtocol):
+    """Loads the first-level values from the rows of the SQLite table"""
+
+    def __init__(self, connection: sqlite3.Connection, backend: StorageBackendProtocol) -> None:
+        self._connection = connection
+        self._backend = backend
+
+    def encode(self, value: any) -> bytes:
+        data = self._backend.dumps(value)
+        return data if self._backend.binary else data.encode("utf-8")
+
+    def decode(self, data: bytes) -> any:
+        return self._backend.loads(
+            data if self._backend.binary else bytes(data).decode("utf-8")
+        )
+
+    def load(self, key: any) -> any:
+        row = self._connection.execute(
+            f"SELECT value FROM {SQLITE_TABLE} WHERE key = ?", (key, )
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self.decode(row[0])
+
+    def keys(self):
+        for row in self._connection.execute(f"SELECT key FROM {SQLITE_TABLE}"):
+            yield row[0]
+
+    def items(self):
+        for key, data in self._connection.execute(f"SELECT key, value FROM {SQLITE_TABLE}"):
+            yield key, self.decode(data)
+
+
+class SqliteStorage(Storage):
+    """Storage kept in a SQLite database, one row per first-level key
+
+    The first-level keys are loaded on first access, so a storage with many keys
+    (like the ones written with set_hashed) does not need to be loaded at startup.
+    All the paths API works as usual on top of them.
+
+    write_file() writes only the changed first-level keys, in a single transaction.
+    The values are serialized with the given backend, pickle by default.
+    The durability parameter maps to the SQLite "synchronous" setting.
+
+    Iterating the content, like get_all() users or remove_none() do, loads all the keys.
+
+    :Authors:
+        Xavier Arnaus <xavi@arnaus.net>
+
+    """
+
+    def __init__(
+        self,
+        filename,
+        path_separator_char=None,
+        backend: any = BACKEND_PICKLE,
+        durability: str = DURABILITY_FILE,
+        autosave_interval: float = None,
+        autosave_mutations: int = None
+    ) -> None:
+        self._connection = None
+        self._source = None
+        self._dirty_keys = set()
+        self._dirty_all = False
+
+        super().__init__(
+            filename=filename,
+            path_separator_char=path_separator_char,
+            backend=backend,
+            durability=durability,
+            autosave_interval=autosave_interval,
+            autosave_mutations=autosave_mutations
+        )
+
+    def _connect(self) -> None:
+        # The Storage lock serializes the changes, so the connection can be shared
+        self._connection = sqlite3.connect(self._filename, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS[self._durability]}")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} (key PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self._connection.commit()
+        self._source = SqliteSource(self._connection, self._backend)
+
+    def read_file(self) -> None:
+        with self._lock:
+            if self._connection is None:
+                self._connect()
+            self._content = LazyDict(self._source)
+            self._dirty_keys = set()
+            self._dirty_all = False
+            self._saved_generation = self._generation
+
+    def write_file(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                generation = self._generation
+                content = self._content
+                if self._dirty_all:
+                    keys = set(content.loaded_keys()) | content.deleted_keys()
+                else:
+                    keys = self._dirty_keys
+
+                # A dirty key that is neither loaded nor deleted (like after a
+                #   failed change) still holds its stored value
+                deleted = content.deleted_keys()
+                upserts = [
+                    (key, self._source.encode(content[key])) for key in keys
+                    if content.is_loaded(key)
+                ]
+                deletes = [(key, ) for key in keys if key in deleted]
+
+                with self._connection:
+                    self._connection.executemany(
+                        f"INSERT OR REPLACE INTO {SQLITE_TABLE} (key, value) VALUES (?, ?)",
+                        upserts
+                    )
+                    self._connection.executemany(
+                        f"DELETE FROM {SQLITE_TABLE} WHERE key = ?", deletes
+                    )
+
+                content.forget_deleted([key for key, in deletes])
+                self._dirty_keys = set()
+                self._dirty_all = False
+                self._saved_generation = generation
+
+    def _content_changed(self, first_keys: list = None) -> None:
+        if first_keys is None:
+            self._dirty_all = True
+        else:
+            self._dirty_keys.update(first_keys)
+        super()._content_changed(first_keys)
+
+    def merge(
+        self,
+        origin: Dictionary,
+        param_name: str = None,
+        slugify_param_name=False,
+        share: bool = False
+    ) -> Dictionary:
+        """
+        Merges the given Dictionary like Dictionary.merge(), always copying
+
+        The share argument is ignored: sharing would freeze the content,
+            and thawing it would load every row.
+        """
+        if param_name is not None:
+            return super().merge(origin, param_name, slugify_param_name)
+
+        # Merge key by key, so the content stays lazy and only those keys get written
+        with self._lock:
+            self._ensure_not_frozen()
+            for key, value in origin.get_all().items():
+                current = {key: self._content[key]} if key in self._content else {}
+                self._content_changed([key])
+                self._content[key] = Dictionary._merge_complex_recursive(current,
+                                                                         {key: value})[key]
+            return self
+
+    def close(self) -> None:
+        super().close()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -1,10 +1,135 @@
+from __future__ import annotations
 from pyxavi import Dictionary
-from hashlib import sha256
-from slugify import slugify
+from pyxavi.dictionary import slugify_segment
+from hashlib import sha256, blake2b
+from functools import lru_cache, wraps
+from contextlib import contextmanager
+from pyxavi.storage_backend import StorageBackendProtocol, get_storage_backend, YAML_BACKEND
+from pyxavi.storage_backend import BinaryBackend, BINARY_KIND_SECTIONS
+from pyxavi.lazy_dict import LazyDict, LazyDictSourceProtocol
+import marshal
 from pathlib import Path
-import yaml
+from uuid import uuid4
+import threading
+import stat
 import os
 
+# Advisory file locks are only available on POSIX systems
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HASH_SHA256 = "sha256"
+HASH_BLAKE2B = "blake2b"
+HASH_CACHE_SIZE = 4096
+DEFAULT_BLAKE2B_DIGEST_SIZE = 16
+
+# How hard write_file() tries to survive a system crash. The writes are always atomic:
+#   none: only the rename, the data may be lost on a power loss
+#   file: also fsync the file before renaming it
+#   full: also fsync the directory after renaming, so the rename itself is durable
+DURABILITY_NONE = "none"
+DURABILITY_FILE = "file"
+DURABILITY_FULL = "full"
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_FULL)
+
+LOCK_SUFFIX = ".lock"
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def hash_key(
+    param_name: str,
+    hash_algorithm: str = HASH_SHA256,
+    digest_size: int = DEFAULT_BLAKE2B_DIGEST_SIZE
+) -> str:
+    """
+    Returns the hashed key for the given param_name.
+
+    Results are kept in a LRU cache, as the same keys (like URLs) are
+        usually checked over and over. The digest_size only applies to blake2b.
+
+    Raises a ValueError if the hash algorithm is unknown.
+    """
+    if hash_algorithm == HASH_SHA256:
+        return sha256(param_name.encode()).hexdigest()
+    if hash_algorithm == HASH_BLAKE2B:
+        return blake2b(param_name.encode(), digest_size=digest_size).hexdigest()
+    raise ValueError(f"Unknown hash algorithm [{hash_algorithm}]")
+
+
+def _synchronized(method):
+    """Runs the given method holding the lock of the storage"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class _WholeFileSource(LazyDictSourceProtocol):
+    """Parses the whole file on the first access to any key"""
+
+    def __init__(self, filename: str, backend: StorageBackendProtocol) -> None:
+        self._filename = filename
+        self._backend = backend
+        self._content = None
+
+    def _get_content(self) -> dict:
+        if self._content is None:
+            content = Storage._load_file_contents(self._filename, self._backend)
+            if content is None:
+                content = {}
+            if not isinstance(content, dict):
+                raise RuntimeError(f"Lazy storage [{self._filename}] must contain a dict")
+            self._content = content
+        return self._content
+
+    def load(self, key: any) -> any:
+        return self._get_content()[key]
+
+    def keys(self):
+        return self._get_content().keys()
+
+    def items(self):
+        # Given only once, when the LazyDict loads them all
+        content = self._get_content()
+        self._content = None
+        return content.items()
+
+
+class _BinarySectionsSource(LazyDictSourceProtocol):
+    """Reads the index of a binary storage file and then only the requested sections"""
+
+    def __init__(self, filename: str) -> None:
+        self._filename = filename
+        with open(filename, 'rb') as stream:
+            kind, index, data_start = BinaryBackend.read_index_from(stream)
+        if kind != BINARY_KIND_SECTIONS:
+            raise RuntimeError(f"Lazy storage [{filename}] must contain a dict")
+        self._index = index
+        self._data_start = data_start
+
+    def load(self, key: any) -> any:
+        offset, size = self._index[key]
+        with open(self._filename, 'rb') as stream:
+            stream.seek(self._data_start + offset)
+            return marshal.loads(stream.read(size))
+
+    def keys(self):
+        return self._index.keys()
+
+    def items(self):
+        with open(self._filename, 'rb') as stream:
+            stream.seek(self._data_start)
+            data = memoryview(stream.read())
+        return (
+            (key, marshal.loads(data[offset:offset + size]))
+            for key, (offset, size) in self._index.items()
+        )
+
 
 class Storage(Dictionary):
     """Class to handle file-based simple storage
@@ -12,13 +137,77 @@ class Storage(Dictionary):
     Basic load/write, get/set behaviour for key/value
     file-based storage.
 
+    The file format is chosen by the backend parameter (a name like "json"
+    or a backend object) or otherwise by the file extension:
+    YAML (default), JSON (.json), binary (.bin) or pickle (.pickle, .pkl).
+
+    Writes are atomic: the content goes to a temporary file in the same directory
+    that then replaces the file, so readers never see a partial file. The
+    durability parameter sets the fsync calls made on top (see DURABILITY_LEVELS).
+
+    The changes made through set, delete, merge, remove_none and the hashed and
+    slugged setters make the storage dirty. flush() writes only if dirty, and
+    with skip_clean_writes write_file() does too. Changes made directly into the
+    returned objects are not tracked: call mark_dirty() after them.
+
+    With autosave_interval (seconds) and/or autosave_mutations, a background
+    thread flushes a snapshot of the content every interval or after that amount
+    of changes, so write_file() leaves the request path. close() (or leaving the
+    "with" block) stops the thread and flushes synchronously.
+
+    With lazy, the file is not parsed until a key is accessed. The binary
+    format then loads only the requested first-level keys, the other formats
+    parse the whole file on that first access. The content must be a dict.
+
+    With file_locking, read_file() and write_file() hold an advisory fcntl lock
+    on a ".lock" file next to the file: shared for reading, exclusive for
+    writing. transaction() re-reads, applies the changes and writes holding the
+    exclusive lock, so several processes can change the same file without
+    losing updates. Only the processes using file_locking respect the lock.
+
     :Authors:
         Xavier Arnaus <xavi@arnaus.net>
 
     """
 
-    def __init__(self, filename, path_separator_char=None) -> None:
+    def __init__(
+        self,
+        filename,
+        path_separator_char=None,
+        backend: any = None,
+        durability: str = DURABILITY_FILE,
+        skip_clean_writes: bool = False,
+        autosave_interval: float = None,
+        autosave_mutations: int = None,
+        lazy: bool = False,
+        file_locking: bool = False
+    ) -> None:
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level [{durability}]")
+        if file_locking and fcntl is None:
+            raise RuntimeError("File locking needs fcntl, not available in this system")
+
         self._filename = filename
+        self._backend = get_storage_backend(filename, backend)
+        self._durability = durability
+        self._lazy = lazy
+        self._skip_clean_writes = skip_clean_writes
+        self._generation = 0
+        self._saved_generation = 0
+        # The lock guards the content changes, the write lock keeps the writes in order
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._file_locking = file_locking
+        self._lock_filename = f"{filename}{LOCK_SUFFIX}"
+        self._lock_stream = None
+        self._lock_depth = 0
+        self._lock_exclusive = False
+        self._autosave_interval = autosave_interval
+        self._autosave_mutations = autosave_mutations
+        self._autosave_thread = None
+        self._autosave_wakeup = threading.Event()
+        self._autosave_stopping = False
+        self._autosave_error = None
 
         # Assuming that we initialise the parent Dictionary class
         #   content stack with {}
@@ -27,30 +216,261 @@ class Storage(Dictionary):
         # And now make this function to fill the self._content
         self.read_file()
 
+        if autosave_interval is not None or autosave_mutations is not None:
+            self._autosave_thread = threading.Thread(
+                target=self._autosave_loop, name=f"autosave-{filename}", daemon=True
+            )
+            self._autosave_thread.start()
+
+    @staticmethod
+    def _load_file_contents(filename: str, backend: StorageBackendProtocol = None) -> dict:
+        backend = get_storage_backend(filename, backend)
+        with open(filename, 'rb' if backend.binary else 'r') as stream:
+            return backend.load(stream)
+
     @staticmethod
-    def _load_file_contents(filename: str) -> dict:
-        with open(filename, 'r') as stream:
-            return yaml.safe_load(stream)
+    def _write_file_contents(
+        filename: str,
+        content: any,
+        backend: StorageBackendProtocol = None,
+        durability: str = DURABILITY_FILE
+    ) -> None:
+        """
+        Writes the content atomically: into a temporary file that then replaces the file
+
+        A symlinked filename gets its target replaced, and an existing file keeps its mode.
+        """
+        backend = get_storage_backend(filename, backend)
 
+        target = os.path.realpath(filename)
+        directory = os.path.dirname(target)
+        temporary = os.path.join(directory, f".{os.path.basename(target)}.{uuid4().hex}.tmp")
+        try:
+            with open(temporary, 'xb' if backend.binary else 'x') as stream:
+                backend.dump(content, stream)
+                if durability != DURABILITY_NONE:
+                    stream.flush()
+                    os.fsync(stream.fileno())
+
+            if os.path.exists(target):
+                os.chmod(temporary, stat.S_IMODE(os.stat(target).st_mode))
+            os.replace(temporary, target)
+        except BaseException:
+            # Leave the previous file untouched and no leftovers
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+        if durability == DURABILITY_FULL and hasattr(os, "O_DIRECTORY"):
+            directory_descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory_descriptor)
+            finally:
+                os.close(directory_descriptor)
+
+    @staticmethod
+    def convert_file(
+        source: str,
+        destination: str,
+        source_backend: any = None,
+        destination_backend: any = None
+    ) -> None:
+        """
+        Converts a storage file into another format
+
+        The backends are chosen by the file extensions unless they are given.
+        """
+        content = Storage._load_file_contents(
+            source, get_storage_backend(source, source_backend)
+        )
+        Storage._write_file_contents(
+            destination,
+            content if content is not None else {},
+            get_storage_backend(destination, destination_backend)
+        )
+
+    def get_backend(self) -> StorageBackendProtocol:
+        """Returns the backend used to read and write the file"""
+        return self._backend
+
+    @staticmethod
+    def yaml_backend() -> str:
+        """Returns the active YAML backend: "libyaml" or the pure "python" one"""
+        return YAML_BACKEND
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = False):
+        """
+        Holds the advisory lock of the file, when file_locking is enabled
+
+        Nested calls reuse the lock held by the outer one, upgrading it to exclusive
+            if needed, and only the outermost releases it. The storage lock is held
+            meanwhile, as the fcntl lock belongs to the whole instance.
+        """
+        if not self._file_locking:
+            yield
+            return
+
+        with self._lock:
+            if self._lock_depth == 0:
+                self._lock_stream = open(self._lock_filename, 'a')
+            if self._lock_depth == 0 or (exclusive and not self._lock_exclusive):
+                try:
+                    fcntl.flock(
+                        self._lock_stream.fileno(),
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                    )
+                except BaseException:
+                    if self._lock_depth == 0:
+                        self._lock_stream.close()
+                        self._lock_stream = None
+                    raise
+                self._lock_exclusive = exclusive or self._lock_exclusive
+
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    fcntl.flock(self._lock_stream.fileno(), fcntl.LOCK_UN)
+                    self._lock_stream.close()
+                    self._lock_stream = None
+                    self._lock_exclusive = False
+
+    @_synchronized
     def read_file(self) -> None:
-        if os.path.exists(self._filename):
-            self._content = self._load_file_contents(self._filename)
-            if self._content is None:
+        with self._file_lock():
+            if self._lazy:
+                self._content = LazyDict(self._lazy_source())
+            elif os.path.exists(self._filename):
+                self._content = self._load_file_contents(self._filename, self._backend)
+                if self._content is None:
+                    self._content = {}
+            else:
+                Path(self._filename).touch()
                 self._content = {}
-        else:
+            self._saved_generation = self._generation
+
+    def _lazy_source(self) -> LazyDictSourceProtocol:
+        if not os.path.exists(self._filename):
             Path(self._filename).touch()
-            self._content = {}
+        if isinstance(self._backend, BinaryBackend):
+            return _BinarySectionsSource(self._filename)
+        return _WholeFileSource(self._filename, self._backend)
+
+    def is_lazy(self) -> bool:
+        """Returns if the file is loaded on demand"""
+        return self._lazy
 
     def write_file(self) -> None:
-        with open(self._filename, 'w+') as stream:
-            yaml.safe_dump(self._content, stream)
+        with self._write_lock, self._file_lock(exclusive=True):
+            with self._lock:
+                if self._skip_clean_writes and not self.is_dirty():
+                    return
+
+                # Changes made while writing keep the storage dirty
+                generation = self._generation
+                # The dumpers need a plain dict, which also loads what's still in the file
+                content = self._content.copy()\
+                    if isinstance(self._content, LazyDict) else self._content
+                # With autosave, other threads keep changing the content while we write
+                if self._autosave_thread is not None:
+                    content = Dictionary._copy_tree(content)
+
+            self._write_file_contents(self._filename, content, self._backend, self._durability)
+            self._saved_generation = generation
+
+    @contextmanager
+    def transaction(self):
+        """
+        Re-reads the file, lets the block change it and writes it, all under one lock
+
+            with storage.transaction():
+                storage.set("counter", storage.get("counter", 0) + 1)
+
+        The changes made before entering are discarded by the re-read. If the block
+            raises, nothing is written and the file is read again. Other processes
+            are kept out only with file_locking.
+        """
+        with self._write_lock, self._lock, self._file_lock(exclusive=True):
+            self.read_file()
+            try:
+                yield self
+            except BaseException:
+                self.read_file()
+                raise
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Writes the file only if there are changes since the last read or write
+
+        Returns if the file was written.
+        """
+        if not self.is_dirty():
+            return False
+
+        self.write_file()
+        return True
+
+    def is_dirty(self) -> bool:
+        """Returns if there are changes since the last read or write of the file"""
+        return self._generation != self._saved_generation
+
+    def mark_dirty(self) -> None:
+        """Flags changes made directly into the returned objects, so they get written"""
+        self._generation += 1
+
+    def _content_changed(self, first_keys: list = None) -> None:
+        self._generation += 1
+        super()._content_changed(first_keys)
+
+        if self._autosave_mutations is not None and\
+           self._generation - self._saved_generation >= self._autosave_mutations:
+            self._autosave_wakeup.set()
+
+    def _autosave_loop(self) -> None:
+        """Background flushes, every interval or when woken up by the changes"""
+        while not self._autosave_stopping:
+            self._autosave_wakeup.wait(timeout=self._autosave_interval)
+            self._autosave_wakeup.clear()
+            if self._autosave_stopping:
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep the thread alive: the next flush, or the one in close(), retries
+                self._autosave_error = e
+
+    def close(self) -> None:
+        """Stops the autosave thread, if any, and flushes the pending changes"""
+        if self._autosave_thread is not None:
+            self._autosave_stopping = True
+            self._autosave_wakeup.set()
+            self._autosave_thread.join()
+            self._autosave_thread = None
+        self.flush()
+
+    def __enter__(self) -> Storage:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    # The changes hold the lock, so the autosave snapshots are consistent
+    set = _synchronized(Dictionary.set)
+    delete = _synchronized(Dictionary.delete)
+    merge = _synchronized(Dictionary.merge)
+    remove_none = _synchronized(Dictionary.remove_none)
+    initialise_recursive = _synchronized(Dictionary.initialise_recursive)
 
     def get_hashed(self, param_name: str = "", default_value: any = None) -> any:
         """
         Gets a hashed parameter from the storage.
         It is meant only for first level keys.
         """
-        param_name = sha256(param_name.encode()).hexdigest()
+        param_name = hash_key(param_name)
 
         return self.get(param_name, default_value)
 
@@ -59,10 +479,60 @@ class Storage(Dictionary):
         Sets a hashed parameter from the storage.
         It is meant only for first level keys.
         """
-        param_name = sha256(param_name.encode()).hexdigest()
+        param_name = hash_key(param_name)
 
         self.set(param_name, value)
 
+    def get_hashed_many(
+        self,
+        param_names: list,
+        default_value: any = None,
+        hash_algorithm: str = HASH_SHA256,
+        digest_size: int = DEFAULT_BLAKE2B_DIGEST_SIZE,
+        legacy_sha256: bool = False
+    ) -> dict:
+        """
+        Gets several hashed parameters from the storage in one pass.
+        It is meant only for first level keys.
+
+        Returns a dict of {param_name: value}.
+        The hash_algorithm can be HASH_SHA256 (as get_hashed()) or the faster
+            HASH_BLAKE2B, with the given digest_size in bytes.
+        With legacy_sha256, the keys not found by the given algorithm are also
+            looked up by their sha256 hash, for files written by get_hashed().
+        """
+        content = self._content if isinstance(self._content, self._mapping_types) else {}
+        values = {}
+        for param_name in param_names:
+            key = hash_key(param_name, hash_algorithm, digest_size)
+            if key not in content and legacy_sha256 and hash_algorithm != HASH_SHA256:
+                key = hash_key(param_name)
+            values[param_name] = content[key] if key in content else default_value
+        return values
+
+    def set_hashed_many(
+        self,
+        values: dict,
+        hash_algorithm: str = HASH_SHA256,
+        digest_size: int = DEFAULT_BLAKE2B_DIGEST_SIZE
+    ) -> None:
+        """
+        Sets several hashed parameters into the storage in one pass.
+        It is meant only for first level keys.
+
+        Receives a dict of {param_name: value}.
+        The hash_algorithm and digest_size work as in get_hashed_many().
+        """
+        self._ensure_not_frozen()
+
+        hashed = {
+            hash_key(param_name, hash_algorithm, digest_size): value
+            for param_name, value in values.items()
+        }
+        with self._lock:
+            self._content_changed(list(hashed))
+            self._content.update(hashed)
+
     def get_slugged(self, param_name: str = "", default_value: any = None) -> any:
         """
         Gets a slugified parameter from the storage.
@@ -72,7 +542,7 @@ class Storage(Dictionary):
             but keep in mind that the separator "." (as per fefault) will be respected,
             so an URL won't be slugified as a whole.
         """
-        param_name = slugify(param_name)
+        param_name = slugify_segment(param_name)
 
         return self.get(param_name, default_value)
 
@@ -85,6 +555,6 @@ class Storage(Dictionary):
             but keep in mind that the separator "." (as per fefault) will be respected,
             so an URL won't be slugified as a whole.
         """
-        param_name = slugify(param_name)
+        param_name = slugify_segment(param_name)
 
         self.set(param_name, value)
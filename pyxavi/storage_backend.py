@@ -0,0 +1,238 @@
+from __future__ import annotations
+from typing import Protocol
+import marshal
+import pickle
+import struct
+import json
+import yaml
+import os
+
+# Use the libyaml bindings when PyYAML was built with them, as they are much faster
+try:
+    from yaml import CSafeLoader as YamlSafeLoader, CSafeDumper as YamlSafeDumper
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader, SafeDumper as YamlSafeDumper
+    YAML_BACKEND = "python"
+
+BACKEND_YAML = "yaml"
+BACKEND_JSON = "json"
+BACKEND_BINARY = "binary"
+BACKEND_PICKLE = "pickle"
+
+# Binary format: header, then the index of sections, then the sections
+BINARY_MAGIC = b"PYXS"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBQ")
+BINARY_KIND_VALUE = 0
+BINARY_KIND_SECTIONS = 1
+MARSHAL_VERSION = 4
+
+
+class StorageBackendProtocol(Protocol):
+    """Serialization format of a Storage file"""
+
+    name: str
+    extensions: tuple
+    binary: bool
+
+    def loads(self, data: any) -> any:
+        """Returns the content deserialized from the given str or bytes"""
+
+    def dumps(self, content: any) -> any:
+        """Returns the given content serialized as str or bytes"""
+
+    def load(self, stream) -> any:
+        """Returns the content deserialized from the given open file"""
+
+    def dump(self, content: any, stream) -> None:
+        """Writes the given content serialized into the given open file"""
+
+
+class StorageBackend(StorageBackendProtocol):
+    """Base for the backends that serialize the whole content at once"""
+
+    def load(self, stream) -> any:
+        # An empty file has no content, like an empty YAML file
+        data = stream.read()
+        return self.loads(data) if data else None
+
+    def dump(self, content: any, stream) -> None:
+        stream.write(self.dumps(content))
+
+
+class YamlBackend(StorageBackend):
+    """Human editable YAML, the historical format"""
+
+    name = BACKEND_YAML
+    extensions = (".yaml", ".yml")
+    binary = False
+
+    def loads(self, data: str) -> any:
+        return yaml.load(data, Loader=YamlSafeLoader)
+
+    def dumps(self, content: any) -> str:
+        return yaml.dump(content, Dumper=YamlSafeDumper)
+
+    def load(self, stream) -> any:
+        return yaml.load(stream, Loader=YamlSafeLoader)
+
+    def dump(self, content: any, stream) -> None:
+        yaml.dump(content, stream, Dumper=YamlSafeDumper)
+
+
+class JsonBackend(StorageBackend):
+    """
+    Compact JSON
+
+    Only supports the JSON types: tuples are loaded back as lists and
+        the dict keys as strings.
+    """
+
+    name = BACKEND_JSON
+    extensions = (".json", )
+    binary = False
+
+    def loads(self, data: str) -> any:
+        return json.loads(data)
+
+    def dumps(self, content: any) -> str:
+        return json.dumps(content, separators=(",", ":"))
+
+
+class BinaryBackend(StorageBackend):
+    """
+    Compact binary format built on marshal
+
+    A dict content is stored by sections, one per first-level key, after an
+        index of their offsets, so a single key can be loaded without the rest.
+    Only supports the marshal types (the builtin scalars and containers).
+    """
+
+    name = BACKEND_BINARY
+    extensions = (".bin", )
+    binary = True
+
+    def loads(self, data: bytes) -> any:
+        kind, index, data_start = BinaryBackend.read_index(data)
+        if kind == BINARY_KIND_VALUE:
+            return marshal.loads(data[data_start:])
+
+        view = memoryview(data)
+        return {
+            key: marshal.loads(view[data_start + offset:data_start + offset + size])
+            for key, (offset, size) in index.items()
+        }
+
+    def dumps(self, content: any) -> bytes:
+        if not isinstance(content, dict):
+            header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, BINARY_KIND_VALUE, 0)
+            return header + marshal.dumps(content, MARSHAL_VERSION)
+
+        sections = []
+        index = []
+        offset = 0
+        for key, value in content.items():
+            section = marshal.dumps(value, MARSHAL_VERSION)
+            index.append((key, offset, len(section)))
+            sections.append(section)
+            offset += len(section)
+
+        index_data = marshal.dumps(tuple(index), MARSHAL_VERSION)
+        header = BINARY_HEADER.pack(
+            BINARY_MAGIC, BINARY_VERSION, BINARY_KIND_SECTIONS, len(index_data)
+        )
+        return b"".join([header, index_data] + sections)
+
+    @staticmethod
+    def read_index(data: bytes) -> tuple:
+        """
+        Parses the header and the index of the given binary data
+
+        Returns a tuple (kind, {key: (offset, size)}, data_start), where the offsets
+            are relative to data_start.
+
+        Raises a ValueError if the data is not in this format.
+        """
+        if len(data) < BINARY_HEADER.size:
+            raise ValueError("Data too short to be a binary storage")
+        magic, version, kind, index_size = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError("Data is not a binary storage of a known version")
+
+        index_start = BINARY_HEADER.size
+        if kind == BINARY_KIND_VALUE:
+            return kind, None, index_start
+
+        index = marshal.loads(bytes(data[index_start:index_start + index_size]))
+        return kind, {
+            key: (offset, size)
+            for key, offset, size in index
+        }, index_start + index_size
+
+    @staticmethod
+    def read_index_from(stream) -> tuple:
+        """
+        Reads only the header and the index from the given open binary file
+
+        Returns the same as read_index(), with data_start as a file offset.
+        An empty file is an empty dict.
+
+        Raises a ValueError if the file is not in this format.
+        """
+        header = stream.read(BINARY_HEADER.size)
+        if not header:
+            return BINARY_KIND_SECTIONS, {}, 0
+        if len(header) < BINARY_HEADER.size:
+            raise ValueError("Data too short to be a binary storage")
+        index_size = BINARY_HEADER.unpack(header)[3]
+        return BinaryBackend.read_index(header + stream.read(index_size))
+
+
+class PickleBackend(StorageBackend):
+    """
+    Pickle, for any picklable content
+
+    Never load a pickle file from an untrusted source.
+    """
+
+    name = BACKEND_PICKLE
+    extensions = (".pickle", ".pkl")
+    binary = True
+
+    def loads(self, data: bytes) -> any:
+        return pickle.loads(data)
+
+    def dumps(self, content: any) -> bytes:
+        return pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+STORAGE_BACKENDS = {
+    backend.name: backend
+    for backend in (YamlBackend(), JsonBackend(), BinaryBackend(), PickleBackend())
+}
+
+
+def get_storage_backend(filename: str = None, backend: any = None) -> StorageBackendProtocol:
+    """
+    Returns the backend to use for the given filename
+
+    The backend can be given by name or as an object. Otherwise it's chosen
+        by the file extension, defaulting to YAML.
+
+    Raises a ValueError if the given backend name is unknown.
+    """
+    if backend is not None and not isinstance(backend, str):
+        return backend
+
+    if backend is not None:
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend [{backend}]")
+        return STORAGE_BACKENDS[backend]
+
+    extension = os.path.splitext(filename)[1].lower() if filename is not None else ""
+    for candidate in STORAGE_BACKENDS.values():
+        if extension in candidate.extensions:
+            return candidate
+
+    return STORAGE_BACKENDS[BACKEND_YAML]
@@ -1,12 +1,13 @@
 from unittest.mock import Mock, patch, call, mock_open
-from pyxavi import Config, Storage
+from pyxavi import Config, Storage, Dictionary
 from unittest import TestCase
+import time
 import os
 
 CONFIG = {"foo": {"bar": "hola", "foo2": {"bar2": "adios"}}, "que": "tal"}
 
 
-def patched_yaml_safe_load(stream):
+def patched_yaml_safe_load(stream, Loader=None):
     return CONFIG
 
 
@@ -33,7 +34,7 @@ def test_initialize_config_without_params_exception():
         _ = Config()
 
 
-@patch("yaml.safe_load", new=patched_yaml_safe_load)
+@patch("yaml.load", new=patched_yaml_safe_load)
 @patch("builtins.open", mock_open(read_data=""))
 @patch("os.path.exists", new=os_path_exists_true)
 def test_initialize_config_with_filename():
@@ -138,3 +139,230 @@ def test_merging_from_file_path_not_exists():
 
         with TestCase.assertRaises(config, RuntimeError):
             config.merge_from_file(filename="second.yaml")
+
+
+def test_config_is_frozen_and_merges_sharing():
+    params = {"molt": {"be": "si"}}
+    config = initialize()
+
+    config.merge_from_dict(parameters=params)
+
+    assert config.is_frozen() is True
+    assert config.is_indexed() is True
+    assert config.get("molt") == {"be": "si"}
+    assert config.get("que") == "tal"
+    with TestCase.assertRaises(config, RuntimeError):
+        config.set("que", "passa")
+
+
+def test_config_params_are_copied():
+    params = {"molt": {"be": "si"}, "llista": [1]}
+    config = Config(params=params)
+    config.merge_from_dict(parameters={"altre": {"valor": 1}})
+
+    params["molt"]["be"] = "no"
+    params["llista"].append(2)
+
+    assert config.get("molt.be") == "si"
+    assert config.get("llista") == [1]
+
+
+def test_config_changes_in_place_work_on_a_copy():
+    params = {"molt": {"be": "si", "buit": None}, "que": "tal"}
+    config = Config(params=params)
+    other = Config(params=params)
+
+    config.delete("que")
+    assert config.key_exists("que") is False
+    assert config.is_frozen() is False
+
+    # Existing paths are fine, creating them needs set() as before
+    config.initialise_recursive("molt")
+    with TestCase.assertRaises(config, RuntimeError):
+        config.initialise_recursive("nou.cami")
+
+    assert config.remove_none() == 1
+    assert config.get_all() == {"molt": {"be": "si"}}
+
+    config.merge(Dictionary({"molt": {"mes": 1}}))
+    assert config.get("molt") == {"be": "si", "mes": 1}
+
+    # Nothing leaks into the params nor the other instances
+    assert params == {"molt": {"be": "si", "buit": None}, "que": "tal"}
+    assert other.get_all() == params
+    with TestCase.assertRaises(config, RuntimeError):
+        config.set("que", "passa")
+
+
+def test_config_index_follows_merges():
+    config = initialize()
+    assert config.get("foo.foo2.bar2") == "adios"
+
+    config.merge_from_dict(parameters={"foo": {"foo2": {"bar2": "fins ara"}}})
+
+    assert config.get("foo.foo2.bar2") == "fins ara"
+    assert config.get("foo.bar") == "hola"
+
+
+def write_yaml(filename: str, content: str) -> None:
+    with open(filename, "w") as stream:
+        stream.write(content)
+
+
+def test_reload_while_filling_the_index(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo:\n  bar: hola\n")
+    config = Config(filename=main_file)
+    build_bucket = config._build_index_bucket
+    swapped = []
+
+    def build_bucket_and_reload(first_key, content=None):
+        bucket = build_bucket(first_key, content)
+        if not swapped:
+            # A reload and another lookup happen while this bucket is built
+            swapped.append(True)
+            write_yaml(main_file, "foo:\n  bar: adios!\n")
+            assert config.reload_if_changed() is True
+            assert config.get("foo.bar") == "adios!"
+        return bucket
+
+    with patch.object(config, "_build_index_bucket", side_effect=build_bucket_and_reload):
+        # The lookup that started on the previous content still answers from it
+        assert config.get("foo.bar") == "hola"
+
+    assert config.get("foo.bar") == "adios!"
+
+
+def test_reload_if_changed(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    extra_file = str(tmp_path / "extra.yaml")
+    write_yaml(main_file, "foo:\n  bar: hola\nque: tal\n")
+    write_yaml(extra_file, "foo:\n  extra: 1\n")
+
+    config = Config(filename=main_file)
+    config.merge_from_dict({"from": "dict"})
+    config.merge_from_file(extra_file)
+    callback = Mock()
+    config.add_reload_callback(callback)
+
+    with patch.object(Config, "_load_file_contents", wraps=Config._load_file_contents) as load:
+        assert config.reload_if_changed() is False
+        load.assert_not_called()
+
+        write_yaml(extra_file, "foo:\n  extra: 2\n  more: 3\n")
+        assert config.reload_if_changed() is True
+        # Only the changed file is parsed again
+        load.assert_called_once_with(extra_file)
+
+    callback.assert_called_once_with(config)
+    assert config.get_all() == {
+        "foo": {
+            "bar": "hola", "extra": 2, "more": 3
+        }, "que": "tal", "from": "dict"
+    }
+    assert config.get("foo.more") == 3
+    assert config.is_dirty() is False
+    assert config.reload_if_changed() is False
+
+
+def test_reload_keeps_content_on_errors(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo: bar\n")
+    config = Config(filename=main_file)
+
+    os.remove(main_file)
+    with TestCase.assertRaises(config, RuntimeError):
+        config.reload_if_changed()
+    assert config.get("foo") == "bar"
+
+    write_yaml(main_file, "foo: changed\n")
+    assert config.reload_if_changed() is True
+    assert config.get("foo") == "changed"
+
+
+def test_reload_detects_replaced_files(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo: bar\n")
+    config = Config(filename=main_file)
+    signature = os.stat(main_file)
+
+    replacement = str(tmp_path / "replacement.yaml")
+    write_yaml(replacement, "foo: baz\n")
+    os.utime(replacement, ns=(signature.st_atime_ns, signature.st_mtime_ns))
+    os.replace(replacement, main_file)
+
+    assert config.reload_if_changed() is True
+    assert config.get("foo") == "baz"
+
+
+def test_watching(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo: bar\n")
+    config = Config(filename=main_file)
+    reloaded = []
+    config.add_reload_callback(lambda instance: reloaded.append(instance.get("foo")))
+
+    config.start_watching(interval=0.01)
+    assert config.is_watching() is True
+    write_yaml(main_file, "foo: changed\n")
+    for _ in range(500):
+        if reloaded:
+            break
+        time.sleep(0.01)
+    config.close()
+
+    assert reloaded == ["changed"]
+    assert config.is_watching() is False
+
+
+def test_parse_cache(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo:\n  bar: hola\n")
+    link = str(tmp_path / "link.yaml")
+    os.symlink(main_file, link)
+    Config.clear_parse_cache()
+
+    with patch.object(Config, "_load_file_contents", wraps=Config._load_file_contents) as load:
+        first = Config(filename=main_file)
+        second = Config(filename=link)
+        load.assert_called_once_with(main_file)
+
+        # Parsed once, but each instance gets its own copy
+        assert first.get("foo") == second.get("foo")
+        assert first.get("foo") is not second.get("foo")
+        assert Config.parse_cache_info() == (1, 1, 1)
+
+        write_yaml(main_file, "foo:\n  bar: adios\n")
+        assert Config(filename=main_file).get("foo.bar") == "adios"
+        assert load.call_count == 2
+
+    assert Config.parse_cache_info() == (1, 2, 1)
+    Config.clear_parse_cache()
+    assert Config.parse_cache_info() == (0, 0, 0)
+
+
+def test_parse_cache_does_not_leak_changes(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "a:\n  b: 1\n")
+    Config.clear_parse_cache()
+
+    first = Config(filename=main_file)
+    second = Config(filename=main_file)
+    first.get_all()["a"]["b"] = 999
+
+    assert second.get("a.b") == 1
+    assert Config(filename=main_file).get("a.b") == 1
+    assert Config.parse_cache_info().misses == 1
+
+
+def test_merge_from_env():
+    config = Config(params=CONFIG)
+    config.merge_from_env(
+        "APP", environ={
+            "APP__FOO__BAR": "adeu", "APP__PORT": "8080", "OTHER__PORT": "1"
+        }
+    )
+
+    assert config.get("foo.bar") == "adeu"
+    assert config.get("foo.foo2.bar2") == "adios"
+    assert config.get("port") == 8080
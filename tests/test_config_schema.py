@@ -0,0 +1,108 @@
+from pyxavi import ConfigSchema, ConfigField, ConfigValidationError, Config, LayeredConfig
+from pyxavi.config_schema import ConfigValues
+import pytest
+
+CONFIG = {
+    "database": {
+        "host": "localhost", "port": "5432", "timeout": 5
+    },
+    "debug": "yes",
+    "tags": ["a", "b"],
+    "empty": None,
+}
+
+
+def get_schema(fields: dict = None) -> ConfigSchema:
+    return ConfigSchema(
+        fields if fields is not None else {
+            "database.host": ConfigField(str, required=True),
+            "database.port": ConfigField(int, default=3306),
+            "database.timeout": ConfigField(float),
+            "database.user": ConfigField(str, default="root"),
+            "debug": bool,
+            "tags": list,
+            "empty": ConfigField(dict, default={}),
+            "anything": ConfigField(),
+        }
+    )
+
+
+def test_validate():
+    values = get_schema().validate(Config(params=CONFIG))
+
+    assert isinstance(values, ConfigValues)
+    assert dict(values) == {
+        "database.host": "localhost",
+        "database.port": 5432,
+        "database.timeout": 5.0,
+        "database.user": "root",
+        "debug": True,
+        "tags": ["a", "b"],
+        "empty": {},
+        "anything": None,
+    }
+    assert isinstance(values["database.timeout"], float)
+
+    with pytest.raises(KeyError):
+        values["unknown"]
+
+
+def test_validation_reports_all_errors():
+    schema = get_schema(
+        {
+            "database.host": ConfigField(str, required=True),
+            "database.name": ConfigField(str, required=True),
+            "database.port": bool,
+            "database.timeout": str,
+            "tags": dict,
+        }
+    )
+
+    with pytest.raises(ConfigValidationError) as error:
+        schema.validate(Config(params=CONFIG))
+
+    assert error.value.errors == [
+        "[database.name] is required",
+        "[database.port] is invalid: Value [5432] is not a bool",
+        "[database.timeout] is invalid: expected str, got int",
+        "[tags] is invalid: expected dict, got list",
+    ]
+    assert isinstance(error.value, RuntimeError)
+    assert "[database.name] is required" in str(error.value)
+
+
+def test_field_conversions():
+    assert ConfigField(float).convert(3) == 3.0
+    assert ConfigField(int).convert("7") == 7
+    assert ConfigField(dict).convert('{"a": 1}') == {"a": 1}
+
+    with pytest.raises(ValueError):
+        ConfigField(int).convert(True)
+    with pytest.raises(ValueError):
+        ConfigField(set)
+    with pytest.raises(ValueError):
+        ConfigSchema({"tags.#": list})
+
+
+def test_config_typed_accessors():
+    config = Config(params=CONFIG)
+    with pytest.raises(RuntimeError):
+        config.get_typed("database.port")
+
+    config = Config(params=CONFIG, schema=get_schema())
+    assert config.get_typed("database.port") == 5432
+    assert config.get_typed("database.user") == "root"
+    assert config.get("database.port") == "5432"
+
+    with pytest.raises(ConfigValidationError):
+        Config(params={}, schema=get_schema())
+
+
+def test_layered_config_with_env():
+    config = LayeredConfig(params=CONFIG)
+    config.merge_from_env("APP", environ={"APP__DATABASE__PORT": "6543", "APP__DEBUG": "0"})
+    values = config.validate(get_schema())
+
+    assert values["database.port"] == 6543
+    assert values["debug"] is False
+    assert config.get_typed("database.host") == "localhost"
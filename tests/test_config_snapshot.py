@@ -0,0 +1,103 @@
+from pyxavi import Config, ConfigSnapshot, FrozenDict
+from unittest import TestCase
+import pytest
+import pickle
+
+CONFIG = {
+    "foo": {
+        "bar": "hola", "items": [{
+            "name": "a"
+        }, {
+            "name": "b"
+        }], "tags": {"x"}
+    },
+    "que": "tal",
+    "void": None,
+}
+
+
+def initialize():
+    return Config(params=CONFIG).snapshot()
+
+
+def test_snapshot_is_frozen():
+    snapshot = initialize()
+
+    assert isinstance(snapshot, ConfigSnapshot)
+    assert isinstance(snapshot.get_all(), FrozenDict)
+    assert snapshot.get("foo.items") == ({"name": "a"}, {"name": "b"})
+    assert snapshot.get("foo.tags") == frozenset({"x"})
+
+
+@pytest.mark.parametrize(
+    argnames=('param_name', 'expected_value'),
+    argvalues=[
+        ("que", "tal"),
+        ("foo.bar", "hola"),
+        ("foo.items.1.name", "b"),
+        ("foo.items.-1.name", "b"),
+        ("foo.items.#.name", ["a", "b"]),
+        ("foo.missing", "default"),
+        ("void", None),
+    ],
+)
+def test_snapshot_get(param_name, expected_value):
+    snapshot = initialize()
+
+    assert snapshot.get(param_name, "default") == expected_value
+
+
+def test_snapshot_reads():
+    snapshot = initialize()
+
+    assert snapshot.key_exists("foo.items.1") is True
+    assert snapshot.key_exists("foo.items.2") is False
+    assert snapshot.get_keys_in("foo") == ["bar", "items", "tags"]
+    assert snapshot.get_keys_in("foo.items") == [0, 1]
+    assert list(snapshot.iter_matches("foo.items.#.name")) == [
+        ("foo.items.0.name", "a"), ("foo.items.1.name", "b")
+    ]
+
+
+def test_snapshot_denies_changes():
+    snapshot = initialize()
+
+    for method, args in [
+        (snapshot.set, ("foo.bar", "adeu")),
+        (snapshot.delete, ("foo.bar", )),
+        (snapshot.initialise_recursive, ("foo.new", )),
+        (snapshot.merge, (ConfigSnapshot({"a": 1}), )),
+        (snapshot.remove_none, ()),
+        (snapshot.thaw, ()),
+    ]:
+        with TestCase.assertRaises(snapshot, RuntimeError):
+            method(*args)
+
+    with TestCase.assertRaises(snapshot, TypeError):
+        snapshot.get("foo")["bar"] = "adeu"
+
+
+def test_snapshot_is_hashable_and_picklable():
+    snapshot = initialize()
+    same = ConfigSnapshot(CONFIG)
+    other = ConfigSnapshot({**CONFIG, "que": "passa"})
+
+    assert snapshot == same
+    assert hash(snapshot) == hash(same)
+    assert snapshot != other
+    assert {snapshot: 1}[same] == 1
+
+    unpickled = pickle.loads(pickle.dumps(snapshot))
+    assert unpickled == snapshot
+    assert unpickled.get("foo.items.0.name") == "a"
+
+
+def test_snapshot_to_dict_is_a_mutable_copy():
+    snapshot = initialize()
+
+    content = snapshot.to_dict()
+    assert content == CONFIG
+    assert isinstance(content["foo"]["items"], list)
+
+    content["foo"]["bar"] = "adeu"
+    assert snapshot.get("foo.bar") == "hola"
@@ -1,4 +1,5 @@
 from pyxavi import Dictionary, dd
+from pyxavi.dictionary import compile_path
 from unittest import TestCase
 import pytest
 import copy
@@ -779,3 +780,348 @@ def test_merge_complex():
     base.merge(over)
 
     assert base.get_all() == expected
+
+
+@pytest.mark.parametrize(
+    argnames=('param_name', 'expected_keys', 'expected_parent_path', 'slugify_param_name'),
+    argvalues=[
+        ("que", ("que", ), None, False),
+        ("foo.foo2.bar2", ("foo", "foo2", "bar2"), "foo.foo2", False),
+        ("bbb.b2.1.bb2b1", ("bbb", "b2", 1, "bb2b1"), "bbb.b2.1", False),
+        ("ggg.#.g1", ("ggg", "#", "g1"), "ggg.#", False),
+        ("2025/01/01.00:00", ("2025-01-01", "00-00"), "2025-01-01", True),
+    ]
+)
+def test_compile_path(param_name, expected_keys, expected_parent_path, slugify_param_name):
+
+    path = compile_path(param_name, ".", slugify_param_name)
+
+    assert path.keys == expected_keys
+    assert path.parent_path == expected_parent_path
+    assert path.needs_resolving is ("#" in param_name)
+
+
+def test_compile_path_is_cached():
+    Dictionary.clear_path_cache()
+    instance = initialize_instance()
+
+    instance.get("foo.foo2.bar2")
+    instance.key_exists("foo.foo2.bar2")
+    instance.set("foo.foo2.bar2", "hey")
+
+    # One miss for the path itself plus one for its parent, needed by key_exists
+    assert compile_path.cache_info().misses == 2
+    assert compile_path("foo.foo2.bar2", ".", False) is\
+        compile_path("foo.foo2.bar2", ".", False)
+
+
+def test_slugified_segments_are_cached():
+    Dictionary.clear_path_cache()
+    instance = Dictionary({})
+
+    instance.set("Hello World.a", 1, slugify_param_name=True)
+    instance.set("Hello World.b", 2, slugify_param_name=True)
+
+    assert instance.get_all() == {"hello-world": {"a": 1, "b": 2}}
+    cache_info = Dictionary.slugify_cache_info()
+    assert cache_info.misses == 3
+    assert cache_info.hits == 1
+
+
+def test_compiled_paths_are_accepted_as_param_name():
+    instance = Dictionary({})
+    path = instance.compile_path("Hello World.Visits", slugify_param_name=True)
+
+    instance.set(path, 1)
+
+    assert instance.get(path) == 1
+    assert instance.key_exists(path) is True
+    assert instance.get_parent_path(path) == "hello-world"
+    assert instance.get_keys_in(path.parent) == ["visits"]
+    assert instance.delete(path) is True
+    assert instance.get_all() == {"hello-world": {}}
+
+    with TestCase.assertRaises(instance, ValueError):
+        Dictionary({}, path_separator_char="/").get(path)
+
+
+def test_wildcards_walk_big_lists_in_order():
+    instance = Dictionary(
+        {"items": [{
+            "tags": [{
+                "name": f"{i}a"
+            }, {
+                "name": f"{i}b"
+            }]
+        } for i in range(1000)]}
+    )
+
+    result = instance.get("items.#.tags.#.name")
+
+    assert len(result) == 2000
+    assert result[:4] == ["0a", "0b", "1a", "1b"]
+    assert instance.resolve_wildcards("items.#.tags.#.name")[-1] == "items.999.tags.1.name"
+
+    instance.set("items.#.tags.#.name", "x")
+
+    assert instance.get("items.#.tags.#.name") == ["x"] * 2000
+
+
+@pytest.mark.parametrize(
+    argnames=('param_name', 'limit', 'expected_result'),
+    argvalues=[
+        ("que", None, [("que", "tal")]),
+        ("void", None, [("void", None)]),
+        ("nope", None, []),
+        ("aaa.1", None, [("aaa.1", "a2")]),
+        ("ggg.#.g1", None, [("ggg.0.g1", "G1a"), ("ggg.1.g1", "G1b"), ("ggg.2.g1", "G1c")]),
+        ("ggg.#.g1", 2, [("ggg.0.g1", "G1a"), ("ggg.1.g1", "G1b")]),
+        ("ggg.#.g1", 0, []),
+        ("hhh.#.h3.#.hh3", 1, [("hhh.0.h3.0.hh3", "HH3a")]),
+        ("iii.#.i3.#.ii3", None, [("iii.0.i3.0.ii3", "II3a")]),
+    ]
+)
+def test_iter_matches(param_name, limit, expected_result):
+
+    instance = initialize_instance()
+
+    assert list(instance.iter_matches(param_name=param_name, limit=limit)) == expected_result
+
+
+def test_iter_matches_stops_walking_early():
+    visited = []
+
+    class Spy(dict):
+
+        def __contains__(self, key):
+            visited.append(self["id"])
+            return super().__contains__(key)
+
+    instance = Dictionary({"items": [Spy({"id": i, "name": i}) for i in range(100)]})
+
+    matches = instance.iter_matches("items.#.name")
+    assert next(matches) == ("items.0.name", 0)
+    assert next(matches) == ("items.1.name", 1)
+
+    assert visited == [0, 1]
+
+
+def test_merge_shared():
+    base_content = {"a": {"a1": {"deep": [1, 2]}, "a2": "A2"}, "b": {"b1": "B1"}, "l": [1]}
+    over_content = {"a": {"a2": "new"}, "c": {"c1": "C1"}, "l": [2]}
+    base = Dictionary(copy.deepcopy(base_content))
+    untouched = base.get("b")
+    untouched_deep = base.get("a.a1")
+    over = Dictionary(over_content)
+
+    expected = Dictionary(copy.deepcopy(base_content))
+    expected.merge(Dictionary(copy.deepcopy(over_content)))
+
+    base.merge(over, share=True)
+
+    assert base.get_all() == expected.get_all()
+    # Untouched subtrees are shared, not copied
+    assert base.get("b") is untouched
+    assert base.get("a.a1") is untouched_deep
+    assert base.get("c") is over_content["c"]
+    # The merged path is a new object
+    assert base.get("a") is not untouched_deep
+
+
+def test_merge_shared_does_not_modify_the_sides():
+    base_content = {"a": {"a1": "A1"}}
+    base = Dictionary(base_content).freeze()
+
+    base.merge(Dictionary({"a": {"a2": "A2"}}), share=True)
+
+    assert base_content == {"a": {"a1": "A1"}}
+    assert base.get("a") == {"a1": "A1", "a2": "A2"}
+
+
+def test_merge_with_share_freezes_both_sides():
+    base = Dictionary({"a": {"a1": "A1"}})
+    over = Dictionary({"z": {"w": [1, None]}})
+
+    base.merge(over, share=True)
+
+    assert base.is_frozen() is True
+    assert over.is_frozen() is True
+    with pytest.raises(RuntimeError):
+        base.set("z.w.0", 99)
+    with pytest.raises(RuntimeError):
+        over.remove_none()
+
+    # Thawing gives a private copy, so the other side stays untouched
+    base.thaw()
+    base.set("z.w.0", 99)
+    base.remove_none()
+    assert base.get("z.w") == [99]
+    assert over.get_all() == {"z": {"w": [1, None]}}
+
+    target = Dictionary({"a": {"a1": "A1"}})
+    target.merge(Dictionary({"a2": "A2"}), param_name="a", share=True)
+    assert target.get("a") == {"a1": "A1", "a2": "A2"}
+    assert target.is_frozen() is True
+
+
+def test_freeze_and_thaw():
+    instance = initialize_instance().freeze()
+
+    assert instance.is_frozen() is True
+    with TestCase.assertRaises(instance, RuntimeError):
+        instance.set("foo.bar", "x")
+    with TestCase.assertRaises(instance, RuntimeError):
+        instance.delete("foo.bar")
+    with TestCase.assertRaises(instance, RuntimeError):
+        instance.initialise_recursive("foo.new")
+    with TestCase.assertRaises(instance, RuntimeError):
+        instance.remove_none()
+    with TestCase.assertRaises(instance, RuntimeError):
+        instance.merge(Dictionary({"que": "passa"}))
+
+    shared = instance.get("foo")
+    instance.thaw()
+    instance.set("foo.bar", "x")
+
+    assert instance.is_frozen() is False
+    assert instance.get("foo.bar") == "x"
+    assert shared["bar"] == "hola"
+
+
+def _deep_chain(depth: int, leaf: any) -> dict:
+    root = {}
+    node = root
+    for _ in range(depth):
+        node["child"] = {}
+        node = node["child"]
+    node["leaf"] = leaf
+    node["void"] = None
+    return root
+
+
+def test_deep_trees_do_not_hit_the_recursion_limit():
+    depth = 5000
+    base = Dictionary(_deep_chain(depth, "base"))
+    over = Dictionary(_deep_chain(depth, "over"))
+    leaf_path = ".".join(["child"] * depth + ["leaf"])
+
+    base.merge(over)
+    assert base.get(leaf_path) == "over"
+
+    base.merge(Dictionary(_deep_chain(depth, "shared")), share=True)
+    assert base.get(leaf_path) == "shared"
+
+    base.thaw().remove_none()
+    assert base.key_exists(".".join(["child"] * depth + ["void"])) is False
+
+    base.freeze().thaw()
+    assert base.get(leaf_path) == "shared"
+
+
+def test_remove_none_cleans_sequences():
+    instance = Dictionary({"a": [1, None, (2, None, {"b": None, "c": 3})], "d": {None, 4}})
+
+    assert instance.remove_none() == 4
+
+    assert instance.get_all() == {"a": [1, (2, {"c": 3})], "d": {4}}
+
+
+def test_remove_none_in_place():
+    untouched_list = [1, 2, {"a": None}]
+    untouched_tuple = (1, [None, 2])
+    dirty_list = [None, 1, None]
+    dirty_tuple = (1, None)
+    content = {
+        "untouched_list": untouched_list,
+        "untouched_tuple": untouched_tuple,
+        "dirty_list": dirty_list,
+        "dirty_tuple": dirty_tuple,
+        "nested_tuple": ((None, ), "x"),
+    }
+    instance = Dictionary(content)
+
+    assert instance.remove_none() == 6
+
+    assert instance.get_all() is content
+    assert content["untouched_list"] is untouched_list
+    assert untouched_list == [1, 2, {}]
+    assert content["untouched_tuple"] is untouched_tuple
+    assert untouched_tuple == (1, [2])
+    assert content["dirty_list"] is dirty_list
+    assert dirty_list == [1]
+    assert content["dirty_tuple"] == (1, )
+    assert content["nested_tuple"] == ((), "x")
+    assert instance.remove_none() == 0
+
+
+@pytest.mark.parametrize(
+    argnames=('param_name', 'default_value'),
+    argvalues=[
+        ("foo", None),
+        ("foo.bar", None),
+        ("foo.void", "default"),
+        ("foo.items.1.name", None),
+        ("foo.items.-1.name", None),
+        ("foo.items.5", "default"),
+        ("foo.numbers.0", None),
+        ("foo.dotted.key", None),
+        ("foo.bar.missing", "default"),
+        ("missing.path", "default"),
+    ],
+)
+def test_index_answers_as_the_walk(param_name, default_value):
+    content = {
+        "foo": {
+            "bar": "hola",
+            "void": None,
+            "items": [{
+                "name": "a"
+            }, {
+                "name": "b"
+            }],
+            "numbers": {
+                0: "zero"
+            },
+            "dotted.key": "unreachable",
+        }
+    }
+    walked = Dictionary(copy.deepcopy(content))
+    indexed = Dictionary(copy.deepcopy(content), use_index=True)
+
+    assert indexed.is_indexed() is True
+    assert indexed.get(param_name, default_value) == walked.get(param_name, default_value)
+    assert indexed.key_exists(param_name) == walked.key_exists(param_name)
+
+
+def test_index_is_invalidated_by_changes():
+    instance = Dictionary({"a": {"b": {"c": 1}}, "x": {"y": 2}}, use_index=True)
+    assert instance.get("a.b.c") == 1
+    assert instance.get("x.y") == 2
+    x_bucket = instance._index["x"]
+
+    instance.set("a.b.c", 10)
+    assert instance.get("a.b.c") == 10
+    assert instance._index["x"] is x_bucket
+
+    instance.delete("a.b")
+    assert instance.key_exists("a.b.c") is False
+
+    instance.initialise_recursive("a.d.e")
+    assert instance.get("a.d.e") == {}
+
+    instance.merge(Dictionary({"a": {"d": {"e": 3}}}), share=True)
+    assert instance.get("a.d.e") == 3
+    assert instance._index["x"] is x_bucket
+
+    instance.thaw()
+    instance.merge(Dictionary({"x": {"y": None}}))
+    assert instance.get("x.y", "default") == "default"
+    assert instance.remove_none() == 1
+    assert instance.key_exists("x.y") is False
+
+    instance._content = {"a": {"b": "replaced"}}
+    assert instance.get("a.b") == "replaced"
+
+    instance.disable_index()
+    assert instance.is_indexed() is False
+    assert instance.get("a.b") == "replaced"
@@ -0,0 +1,91 @@
+from pyxavi.env_overlay import coerce_env_value, env_overlay
+import pytest
+
+
+@pytest.mark.parametrize(
+    argnames=("value", "expected"),
+    argvalues=[
+        ("true", True),
+        ("Yes", True),
+        ("off", False),
+        ("42", 42),
+        ("-7", -7),
+        ("3.5", 3.5),
+        ("1e3", 1000.0),
+        ("nan", "nan"),
+        ("[1, 2]", [1, 2]),
+        ('{"a": 1}', {
+            "a": 1
+        }),
+        ('"quoted"', "quoted"),
+        ("[not json", "[not json"),
+        ("hola", "hola"),
+        ("", ""),
+    ],
+)
+def test_coerce_guessing(value, expected):
+    assert coerce_env_value(value) == expected
+
+
+@pytest.mark.parametrize(
+    argnames=("value", "value_type", "expected"),
+    argvalues=[
+        ("1", bool, True),
+        ("no", bool, False),
+        ("42", str, "42"),
+        ("42", float, 42.0),
+        ("[1]", list, [1]),
+        ('{"a": 1}', dict, {
+            "a": 1
+        }),
+    ],
+)
+def test_coerce_to_type(value, value_type, expected):
+    assert coerce_env_value(value, value_type) == expected
+
+
+@pytest.mark.parametrize(
+    argnames=("value", "value_type"),
+    argvalues=[("maybe", bool), ("4.2", int), ("[1]", dict), ("{", list), ("1", set)],
+)
+def test_coerce_to_type_errors(value, value_type):
+    with pytest.raises(ValueError):
+        coerce_env_value(value, value_type)
+
+
+def test_env_overlay():
+    environ = {
+        "APP__DATABASE__HOST": "localhost",
+        "APP__DATABASE__PORT": "5432",
+        "APP__DEBUG": "true",
+        "APP__FEATURE": "on",
+        "APP__FEATURE__NAME": "nested",
+        "APP____EMPTY": "ignored",
+        "APP__": "ignored",
+        "OTHER__DEBUG": "false",
+        "APP": "ignored",
+    }
+
+    assert env_overlay("APP", environ) == {
+        "database": {
+            "host": "localhost", "port": 5432
+        },
+        "debug": True,
+        "feature": {
+            "name": "nested"
+        },
+    }
+    assert env_overlay(
+        "APP", {"APP_X_Y": "1"}, separator="_", lowercase_keys=False
+    ) == {
+        "X": {
+            "Y": 1
+        }
+    }
+    assert env_overlay("APP", {"APP__PORT": "1"}, coerce=False) == {"port": "1"}
+
+
+def test_env_overlay_reads_os_environ(monkeypatch):
+    monkeypatch.setenv("PYXAVI_TEST__VALUE", "1.5")
+
+    assert env_overlay("PYXAVI_TEST") == {"value": 1.5}
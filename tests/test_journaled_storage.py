@@ -0,0 +1,131 @@
+from pyxavi import JournaledStorage, Dictionary
+import pytest
+import os
+
+
+@pytest.fixture
+def filename(tmp_path):
+    filename = tmp_path / "storage.yaml"
+    filename.write_text("que: tal\n")
+    return str(filename)
+
+
+def journal_lines(filename: str) -> list:
+    """Returns the records of the journal, after checking its header"""
+    with open(f"{filename}.journal", "r") as stream:
+        lines = stream.read().splitlines()
+    assert lines[0].startswith('["b","')
+    return lines[1:]
+
+
+def test_changes_are_journaled_and_replayed(filename):
+    instance = JournaledStorage(filename=filename)
+    instance.set("foo.bar", "hola")
+    instance.set("Hello World", 1, slugify_param_name=True)
+    instance.initialise_recursive("foo.baz.qux")
+    instance.delete("que")
+    instance.set_hashed("https://www.example.com", 42)
+    instance.write_file()
+
+    assert journal_lines(filename)[0] == '["s","foo.bar","hola"]'
+    assert len(journal_lines(filename)) == 5
+    with open(filename, "r") as stream:
+        assert stream.read() == "que: tal\n"
+
+    replayed = JournaledStorage(filename=filename)
+    assert replayed.get_all() == instance.get_all()
+    assert replayed.get("hello-world") == 1
+    assert replayed.get_hashed("https://www.example.com") == 42
+    assert replayed.is_dirty() is False
+
+
+def test_merges_are_journaled_by_result(filename):
+    instance = JournaledStorage(filename=filename)
+    instance.set("items", [1])
+    instance.merge(Dictionary({"items": [2], "new": {"a": 1}}))
+    instance.merge(Dictionary({"b": 2}), param_name="new")
+    instance.set_hashed_many({"https://www.example.com": 1})
+    instance.close()
+
+    # Replaying the merge records twice gives the same, as they hold the results
+    with open(f"{filename}.journal", "a") as stream:
+        stream.write("\n".join(journal_lines(filename)) + "\n")
+
+    replayed = JournaledStorage(filename=filename)
+    assert replayed.get("items") == [1, 2]
+    assert replayed.get("new") == {"a": 1, "b": 2}
+    assert replayed.get_hashed_many(["https://www.example.com"]) == {
+        "https://www.example.com": 1
+    }
+
+
+def test_compaction_past_the_threshold(filename):
+    instance = JournaledStorage(filename=filename, journal_max_size=128)
+    instance.set("foo", "a" * 10)
+    instance.write_file()
+    assert len(journal_lines(filename)) == 1
+
+    instance.set("foo", "b" * 128)
+    instance.write_file()
+
+    assert os.path.getsize(f"{filename}.journal") == 0
+    assert JournaledStorage(filename=filename).get_all() == {"que": "tal", "foo": "b" * 128}
+
+    instance.set("bar", 1)
+    assert journal_lines(filename) == ['["s","bar",1]']
+
+
+def test_values_that_cant_be_journaled_force_the_compaction(filename):
+    instance = JournaledStorage(filename=filename)
+    instance.set("foo", {1, 2})
+    assert os.path.exists(f"{filename}.journal") is False
+
+    instance.write_file()
+
+    assert JournaledStorage(filename=filename).get("foo") == {1, 2}
+
+
+def test_incomplete_last_record_is_ignored(filename):
+    instance = JournaledStorage(filename=filename)
+    instance.set("foo", 1)
+    instance.close()
+    with open(f"{filename}.journal", "a") as stream:
+        stream.write('["s","bar",')
+
+    replayed = JournaledStorage(filename=filename)
+    replayed.set("baz", 2)
+
+    assert journal_lines(filename) == ['["s","foo",1]', '["s","baz",2]']
+    assert replayed.key_exists("bar") is False
+    assert JournaledStorage(filename=filename).get("baz") == 2
+
+
+def test_journal_left_by_a_compaction_is_not_replayed(filename):
+    instance = JournaledStorage(filename=filename)
+    instance.set("items", ["a", "b", "c"])
+    instance.compact()
+    instance.delete("items.0")
+    with open(f"{filename}.journal", "rb") as stream:
+        journal = stream.read()
+
+    # A crash between writing the file and emptying the journal
+    instance.compact()
+    instance.close()
+    with open(f"{filename}.journal", "wb") as stream:
+        stream.write(journal)
+
+    replayed = JournaledStorage(filename=filename)
+    assert replayed.get("items") == ["b", "c"]
+    assert os.path.getsize(f"{filename}.journal") == 0
+
+    # And the next records apply to the current file
+    replayed.delete("items.0")
+    replayed.close()
+    assert JournaledStorage(filename=filename).get("items") == ["c"]
+
+
+def test_journal_without_header_is_replayed(filename):
+    with open(f"{filename}.journal", "w") as stream:
+        stream.write('["s","foo",1]\n')
+
+    assert JournaledStorage(filename=filename).get("foo") == 1
@@ -0,0 +1,274 @@
+from pyxavi import LayeredConfig, Config, Dictionary
+import pytest
+import os
+
+BASE = {
+    "foo": {
+        "bar": "hola", "deep": {
+            "one": 1, "two": 2
+        }, "list": [1, 2]
+    },
+    "que": "tal",
+    "items": ["a", "b"],
+    "scalar": {
+        "to": "dict"
+    },
+    "none": None,
+}
+OVERRIDES = [
+    {
+        "foo": {
+            "deep": {
+                "two": 22, "three": 3
+            }, "list": [3]
+        }, "items": ["c"]
+    },
+    {
+        "scalar": 5, "new": {
+            "key": "value"
+        }, "items": ["d"]
+    },
+    {
+        "foo": {
+            "bar": None
+        }, "que": {
+            "now": "dict"
+        }
+    },
+]
+PATHS = [
+    "foo",
+    "foo.bar",
+    "foo.deep",
+    "foo.deep.one",
+    "foo.deep.two",
+    "foo.deep.three",
+    "foo.list",
+    "foo.list.0",
+    "foo.list.1",
+    "que",
+    "que.now",
+    "items",
+    "items.0",
+    "items.3",
+    "items.4",
+    "scalar",
+    "new.key",
+    "none",
+    "none.key",
+    "missing",
+    "missing.key",
+]
+
+
+def write_yaml(filename: str, content: str) -> None:
+    with open(filename, "w") as stream:
+        stream.write(content)
+
+
+def initialize() -> tuple:
+    eager = Config(params=BASE)
+    layered = LayeredConfig(params=BASE)
+    for override in OVERRIDES:
+        eager.merge_from_dict(override)
+        layered.merge_from_dict(override)
+    return eager, layered
+
+
+@pytest.mark.parametrize(argnames=("path"), argvalues=PATHS)
+def test_resolves_as_the_merged_config(path):
+    eager, layered = initialize()
+
+    assert layered.get(path, "default") == eager.get(path, "default")
+    assert layered.key_exists(path) == eager.key_exists(path)
+
+
+NESTED_LISTS = [
+    {
+        "srv": {
+            "hosts": [{
+                "name": "old", "port": 1
+            }, {
+                "name": "other"
+            }],
+            "opts": {
+                "retries": [{
+                    "after": 1
+                }]
+            }
+        }
+    },
+    {
+        "srv": {
+            "hosts": [{
+                "name": "new"
+            }]
+        }
+    },
+    {
+        "srv": {
+            "opts": {
+                "retries": [[{
+                    "after": 2
+                }]]
+            }
+        }
+    },
+]
+NESTED_LIST_PATHS = [
+    "srv.hosts",
+    "srv.hosts.0",
+    "srv.hosts.0.name",
+    "srv.hosts.0.port",
+    "srv.hosts.1",
+    "srv.hosts.1.name",
+    "srv.opts.retries.0",
+    "srv.opts.retries.0.after",
+    "srv.opts.retries.0.0.after",
+]
+
+
+@pytest.mark.parametrize(argnames=("path"), argvalues=NESTED_LIST_PATHS)
+def test_lists_below_the_first_level_are_not_merged(path):
+    eager = Config(params=NESTED_LISTS[0])
+    layered = LayeredConfig(params=NESTED_LISTS[0])
+    for override in NESTED_LISTS[1:]:
+        eager.merge_from_dict(override)
+        layered.merge_from_dict(override)
+
+    assert layered.get(path, "default") == eager.get(path, "default")
+    assert layered.key_exists(path) == eager.key_exists(path)
+    assert layered.get("srv.hosts.0") == layered.get_all()["srv"]["hosts"][0]
+
+
+def test_overridden_scalars_hide_the_layers_below():
+    _, layered = initialize()
+
+    assert layered.get("scalar") == 5
+    assert layered.get("scalar.to", "default") == "default"
+    assert layered.key_exists("scalar.to") is False
+
+
+def test_whole_content_as_the_merged_config():
+    eager, layered = initialize()
+
+    layered.get("foo.deep.two")
+    assert layered._materialised is None
+
+    assert layered.get_all() == eager.get_all()
+    assert layered.get("items.#") == eager.get("items.#")
+    assert layered.snapshot() == eager.snapshot()
+
+
+def test_layers_are_not_copied():
+    override = {"foo": {"bar": "adeu"}, "list": [1]}
+    layered = LayeredConfig(params=BASE)
+    layered.add_layer(override, name="cli")
+
+    assert layered.get("foo.deep") == BASE["foo"]["deep"]
+    assert layered.get("foo.deep") is not BASE["foo"]["deep"]
+    assert layered.get("foo.bar") == "adeu"
+    assert layered.get("list") is override["list"]
+    # And the resolved paths are remembered
+    assert layered.get("foo") is layered.get("foo")
+
+
+def test_get_layer_for(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo:\n  bar: hola\n  other: 1\nque: tal\n")
+    extra_file = str(tmp_path / "extra.yaml")
+    write_yaml(extra_file, "foo:\n  bar: adeu\n")
+
+    layered = LayeredConfig(filename=main_file, params={"que": "passa"})
+    layered.merge_from_file(extra_file)
+    layered.add_layer({"cli": True}, name="cli")
+    layered.merge_from_dict({"last": 1})
+
+    assert layered.get_layer_names() == [main_file, "params", extra_file, "cli", "layer-4"]
+    assert layered.get_layer_for("foo.other") == main_file
+    assert layered.get_layer_for("foo.bar") == extra_file
+    assert layered.get_layer_for("foo") == extra_file
+    assert layered.get_layer_for("que") == "params"
+    assert layered.get_layer_for("cli") == "cli"
+    assert layered.get_layer_for("last") == "layer-4"
+    assert layered.get_layer_for("missing") is None
+
+    with pytest.raises(ValueError):
+        layered.get_layer_for("foo.#")
+
+
+def test_reload_a_layer(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo: bar\n")
+    extra_file = str(tmp_path / "extra.yaml")
+    write_yaml(extra_file, "que: tal\n")
+
+    layered = LayeredConfig(filename=main_file)
+    layered.add_file_layer(extra_file, name="extra")
+    assert layered.get("que") == "tal"
+
+    write_yaml(extra_file, "que: passa\n")
+    assert layered.reload_if_changed() is True
+    assert layered.get("que") == "passa"
+    assert layered.get_layer_for("que") == "extra"
+    assert layered.get_all() == {"foo": "bar", "que": "passa"}
+
+    with pytest.raises(RuntimeError):
+        layered.add_file_layer(os.path.join(str(tmp_path), "missing.yaml"))
+
+
+def test_is_read_only():
+    layered = LayeredConfig(params=BASE)
+
+    with pytest.raises(RuntimeError):
+        layered.set("foo.bar", "adeu")
+    with pytest.raises(RuntimeError):
+        layered.merge(Dictionary({"foo": 1}), param_name="foo")
+
+    layered.merge(Dictionary({"merged": True}))
+    assert layered.get("merged") is True
+
+
+def test_env_layer():
+    layered = LayeredConfig(params=BASE)
+    layered.merge_from_env("APP", environ={"APP__FOO__DEEP__ONE": "11", "APP__DEBUG": "no"})
+
+    assert layered.get_layer_names() == ["params", "env"]
+    assert layered.get("foo.deep") == {"one": 11, "two": 2}
+    assert layered.get("debug") is False
+    assert layered.get_layer_for("foo.deep.one") == "env"
+    assert layered.get_layer_for("foo.deep.two") == "params"
+
+
+def test_params_are_copied():
+    params = {"foo": {"bar": "hola"}}
+    layered = LayeredConfig(params=params)
+    layered.merge_from_dict({"que": {"tal": 1}})
+
+    params["foo"]["bar"] = "adeu"
+
+    assert layered.get("foo.bar") == "hola"
+    assert layered.get_layer_names() == ["params", "layer-1"]
+
+
+def test_changes_in_place_keep_the_layers(tmp_path):
+    main_file = str(tmp_path / "config.yaml")
+    write_yaml(main_file, "foo:\n  bar: hola\n  buit: null\n")
+    layered = LayeredConfig(filename=main_file)
+    layered.add_layer({"que": "tal"}, name="cli")
+
+    with pytest.raises(RuntimeError):
+        layered.delete("que")
+    with pytest.raises(RuntimeError):
+        layered.remove_none()
+    with pytest.raises(RuntimeError):
+        layered.initialise_recursive("foo.nou")
+    with pytest.raises(RuntimeError):
+        layered.thaw()
+
+    assert layered.get_layer_names() == [main_file, "cli"]
+    assert layered.get_layer_for("que") == "cli"
+
+    write_yaml(main_file, "foo:\n  bar: adeu!\n")
+    assert layered.reload_if_changed() is True
+    assert layered.get("foo.bar") == "adeu!"
@@ -0,0 +1,85 @@
+from pyxavi import LazyDict
+from unittest import TestCase
+
+
+class Source:
+
+    def __init__(self, content: dict) -> None:
+        self.content = content
+        self.loaded = []
+
+    def load(self, key):
+        self.loaded.append(key)
+        return self.content[key]
+
+    def keys(self):
+        return iter(self.content)
+
+    def items(self):
+        self.loaded.append("*")
+        return iter(self.content.items())
+
+
+def initialize():
+    source = Source({"a": 1, "b": {"c": 2}, "d": None})
+    return LazyDict(source), source
+
+
+def test_loads_on_first_access():
+    lazy, source = initialize()
+
+    assert lazy["a"] == 1
+    assert lazy["a"] == 1
+    assert "b" in lazy
+    assert "x" not in lazy
+    assert lazy.get("x", "default") == "default"
+    assert source.loaded == ["a", "b", "x", "x"]
+    assert lazy.loaded_keys() == ["a", "b"]
+    assert bool(lazy) is True
+
+    with TestCase.assertRaises(lazy, KeyError):
+        lazy["x"]
+
+
+def test_deleted_keys_are_not_loaded_again():
+    lazy, source = initialize()
+
+    del lazy["a"]
+
+    assert "a" not in lazy
+    assert lazy.deleted_keys() == {"a"}
+    assert lazy.pop("b") == {"c": 2}
+    assert lazy.pop("b", "default") == "default"
+    lazy["a"] = 3
+    assert lazy.deleted_keys() == {"b"}
+    lazy.forget_deleted(["b"])
+    assert lazy.deleted_keys() == set()
+
+    with TestCase.assertRaises(lazy, KeyError):
+        del lazy["x"]
+
+
+def test_iterating_loads_everything():
+    lazy, source = initialize()
+    lazy["e"] = 5
+    del lazy["d"]
+
+    assert lazy == {"a": 1, "b": {"c": 2}, "e": 5}
+    assert len(lazy) == 3
+    assert sorted(lazy) == ["a", "b", "e"]
+    assert source.loaded == ["d", "*"]
+
+    # Once everything is loaded the source is not asked anymore
+    assert "x" not in lazy
+    assert source.loaded == ["d", "*"]
+
+
+def test_empty_source():
+    lazy = LazyDict(Source({}))
+
+    assert bool(lazy) is False
+    lazy.update({"a": 1})
+    assert bool(lazy) is True
+    lazy.clear()
+    assert lazy == {}
+    assert lazy.deleted_keys() == {"a"}
@@ -0,0 +1,92 @@
+from pyxavi import MappedStorage, Storage
+from pyxavi.mapped_storage import MappedSections
+import pytest
+import os
+
+
+@pytest.fixture
+def filename(tmp_path):
+    source = str(tmp_path / "storage.yaml")
+    storage = Storage(filename=source)
+    storage.set("foo.bar", "hola")
+    storage.set("foo.list", [1, 2, 3])
+    storage.set("que", "tal")
+    storage.set_hashed("https://www.example.com", 42)
+    storage.write_file()
+
+    destination = str(tmp_path / "storage.bin")
+    MappedStorage.compile(source, destination)
+    return destination
+
+
+def test_reads_through_the_map(filename):
+    instance = MappedStorage(filename=filename)
+
+    assert isinstance(instance.get_all(), MappedSections)
+    assert instance.get("foo.bar") == "hola"
+    assert instance.get("foo.list.2") == 3
+    assert instance.get("que") == "tal"
+    assert instance.get("missing", "default") == "default"
+    assert instance.key_exists("foo.list") is True
+    assert instance.key_exists("foo.missing") is False
+    assert instance.get_hashed("https://www.example.com") == 42
+    assert instance.get_hashed_many(["https://www.example.com"]) == {
+        "https://www.example.com": 42
+    }
+    assert sorted(instance.get_keys_in("foo")) == ["bar", "list"]
+    instance.close()
+
+
+def test_decodes_only_the_touched_sections(filename):
+    instance = MappedStorage(filename=filename)
+    instance.get("foo.bar")
+    assert list(instance.get_all()._cache) == ["foo"]
+    assert instance.get("foo") is instance.get("foo")
+    instance.close()
+
+    instance = MappedStorage(filename=filename, cache_sections=False)
+    assert instance.get("foo") is not instance.get("foo")
+    assert instance.get("foo") == instance.get("foo")
+    instance.close()
+
+
+def test_is_read_only(filename):
+    instance = MappedStorage(filename=filename)
+
+    with pytest.raises(RuntimeError):
+        instance.set("foo.bar", "adeu")
+    with pytest.raises(RuntimeError):
+        instance.delete("que")
+    with pytest.raises(RuntimeError):
+        instance.set_hashed("https://www.example.org", 1)
+    with pytest.raises(RuntimeError):
+        instance.merge(Storage(filename=filename))
+    with pytest.raises(RuntimeError):
+        instance.write_file()
+    assert instance.get("foo.bar") == "hola"
+    instance.close()
+
+
+def test_sees_replaced_files_after_read_file(filename):
+    instance = MappedStorage(filename=filename)
+    Storage._write_file_contents(filename, {"new": "content"}, Storage(filename).get_backend())
+
+    assert instance.get("que") == "tal"
+    instance.read_file()
+    assert instance.get("que") is None
+    assert instance.get("new") == "content"
+    instance.close()
+
+
+def test_unmappable_files(tmp_path):
+    filename = str(tmp_path / "storage.bin")
+    open(filename, "w").close()
+    assert MappedStorage(filename=filename).get_all() == {}
+
+    with open(filename, "wb") as stream:
+        stream.write(b"not a binary storage")
+    with pytest.raises(RuntimeError):
+        MappedStorage(filename=filename)
+
+    with pytest.raises(FileNotFoundError):
+        MappedStorage(filename=os.path.join(str(tmp_path), "missing.bin"))
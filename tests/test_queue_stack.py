@@ -1,5 +1,6 @@
 from pyxavi import Storage, Dictionary, Queue, SimpleQueueItem
 from unittest.mock import patch, Mock
+import multiprocessing
 import pytest
 from logging import Logger
 from datetime import datetime
@@ -241,3 +242,43 @@ def test_last(queue_item_1, queue_item_2, queue_item_3):
 
     assert queue_item, queue_item_3
     assert len(queue.get_all()), 3
+
+
+def pop_in_transactions(filename: str, popped) -> None:
+    queue = Queue(storage_file=filename, file_locking=True)
+    while True:
+        with queue.transaction():
+            item = queue.pop()
+        if item is None:
+            return
+        popped.put(item.to_dict()["id"])
+
+
+def test_transactions_share_the_queue(tmp_path):
+    filename = str(tmp_path / "queue.yaml")
+    queue = Queue(storage_file=filename, file_locking=True)
+    for index in range(40):
+        queue.append(SimpleQueueItem({"id": index}))
+    queue.save()
+
+    context = multiprocessing.get_context("fork")
+    popped = context.Queue()
+    processes = [
+        context.Process(target=pop_in_transactions, args=(filename, popped)) for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    ids = [popped.get(timeout=30) for _ in range(40)]
+    for process in processes:
+        process.join()
+
+    assert sorted(ids) == list(range(40))
+    assert Queue(storage_file=filename).is_empty()
+
+
+def test_transaction_stateless():
+    queue = Queue()
+
+    with pytest.raises(RuntimeError):
+        with queue.transaction():
+            pass
@@ -0,0 +1,115 @@
+from pyxavi import SqliteStorage, Dictionary
+import pytest
+import sqlite3
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "storage.sqlite")
+
+
+def rows(filename: str) -> list:
+    with sqlite3.connect(filename) as connection:
+        return sorted(row[0] for row in connection.execute("SELECT key FROM storage"))
+
+
+def test_paths_api_keeps_working(filename):
+    with SqliteStorage(filename=filename) as instance:
+        instance.set("foo.bar", "hola")
+        instance.set("foo.list", [1, 2])
+        instance.set("que", "tal")
+        instance.set_hashed("https://www.example.com", 42)
+        instance.set_slugged("https://www.example.com", 69)
+        instance.set_hashed_many({"https://www.example.org": 43})
+        instance.delete("que")
+
+    instance = SqliteStorage(filename=filename)
+    assert instance.get("foo.bar") == "hola"
+    assert instance.get("foo.list.1") == 2
+    assert instance.key_exists("foo.bar") is True
+    assert instance.key_exists("que") is False
+    assert instance.get("que", "default") == "default"
+    assert instance.get_hashed("https://www.example.com") == 42
+    assert instance.get_slugged("https://www.example.com") == 69
+    assert instance.get_hashed_many(["https://www.example.org"]) == {
+        "https://www.example.org": 43
+    }
+    instance.close()
+
+
+def test_keys_are_loaded_lazily(filename):
+    with SqliteStorage(filename=filename) as instance:
+        for index in range(100):
+            instance.set(f"key_{index}", {"index": index})
+
+    instance = SqliteStorage(filename=filename)
+    assert instance.get("key_42.index") == 42
+    assert instance.get_all().loaded_keys() == ["key_42"]
+    instance.close()
+
+
+def test_writes_only_the_changed_keys(filename):
+    with SqliteStorage(filename=filename) as instance:
+        instance.set("a", 1)
+        instance.set("b", 2)
+
+    instance = SqliteStorage(filename=filename)
+    instance.set("c.d", 3)
+    instance.delete("a")
+    assert rows(filename) == ["a", "b"]
+    assert instance.is_dirty() is True
+
+    instance.write_file()
+
+    assert rows(filename) == ["b", "c"]
+    assert instance.is_dirty() is False
+    assert instance.get_all().loaded_keys() == ["c"]
+    instance.close()
+
+
+def test_failed_changes_do_not_delete_the_stored_keys(filename):
+    with SqliteStorage(filename=filename) as instance:
+        instance.merge(Dictionary({"0": "keep"}))
+
+    instance = SqliteStorage(filename=filename)
+    with pytest.raises(ValueError):
+        instance.set("0.x", 1)
+    instance.write_file()
+    instance.close()
+
+    assert rows(filename) == ["0"]
+    instance = SqliteStorage(filename=filename)
+    assert instance.get("0") == "keep"
+    instance.close()
+
+
+def test_merge_does_not_share_with_the_origin(filename):
+    origin = Dictionary({"k": {"x": [1, 2]}})
+    with SqliteStorage(filename=filename) as instance:
+        instance.merge(origin, share=True)
+        instance.set("k.x.0", 99)
+        instance.merge(Dictionary({"y": [3]}), param_name="k", share=True)
+        instance.set("k.y.0", 4)
+
+        assert instance.is_frozen() is False
+        assert instance.get("k") == {"x": [99, 2], "y": [4]}
+
+    assert origin.get_all() == {"k": {"x": [1, 2]}}
+    assert origin.is_frozen() is False
+
+
+def test_merge_and_remove_none(filename):
+    with SqliteStorage(filename=filename) as instance:
+        instance.set("a", {"inner": 1, "void": None})
+        instance.set("b", [1])
+        instance.set("e", 4)
+
+    instance = SqliteStorage(filename=filename)
+    instance.merge(Dictionary({"a": {"other": 2}, "b": [2], "c": 3}))
+    assert sorted(instance.get_all().loaded_keys()) == ["a", "b", "c"]
+    assert instance.remove_none() == 1
+    instance.close()
+
+    instance = SqliteStorage(filename=filename)
+    assert instance.get_all() == {"a": {"inner": 1, "other": 2}, "b": [1, 2], "c": 3, "e": 4}
+    instance.close()
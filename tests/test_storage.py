@@ -1,6 +1,13 @@
-from unittest.mock import patch, mock_open
+from unittest.mock import patch, mock_open, Mock
 from pyxavi import Storage
+from pyxavi.storage import hash_key, HASH_SHA256, HASH_BLAKE2B
+from pyxavi.storage import DURABILITY_NONE, DURABILITY_FILE, DURABILITY_FULL
+import multiprocessing
 import pytest
+import yaml
+import stat
+import time
+import os
 
 FILE = {
     "foo": {
@@ -34,11 +41,11 @@ GET_KEYS_FILE = {
 }
 
 
-def patched_yaml_safe_load(stream):
+def patched_yaml_safe_load(stream, Loader=None):
     return FILE
 
 
-def patched_get_keys_yaml_safe_load(stream):
+def patched_get_keys_yaml_safe_load(stream, Loader=None):
     return GET_KEYS_FILE
 
 
@@ -54,14 +61,14 @@ def path_touch(file):
     pass
 
 
-@patch("yaml.safe_load", new=patched_yaml_safe_load)
+@patch("yaml.load", new=patched_yaml_safe_load)
 @patch("builtins.open", mock_open(read_data=""))
 @patch("os.path.exists", new=os_path_exists_true)
 def initialize() -> Storage:
     return Storage(FILENAME)
 
 
-@patch("yaml.safe_load", new=patched_yaml_safe_load)
+@patch("yaml.load", new=patched_yaml_safe_load)
 @patch("builtins.open", mock_open(read_data=""))
 @patch("os.path.exists", new=os_path_exists_false)
 @patch("pathlib.Path.touch", new=path_touch)
@@ -235,7 +242,7 @@ def test_set_slugged():
         ("ccc.c_list", [0, 1, 2]), ("ddd.eee", [0, 1, 2])
     ]
 )
-@patch("yaml.safe_load", new=patched_get_keys_yaml_safe_load)
+@patch("yaml.load", new=patched_get_keys_yaml_safe_load)
 @patch("builtins.open", mock_open(read_data=""))
 @patch("os.path.exists", new=os_path_exists_true)
 def test_get_keys_in(param_name, expected_result):
@@ -243,3 +250,384 @@ def test_get_keys_in(param_name, expected_result):
     instance = Storage(FILENAME)
 
     assert instance.get_keys_in(param_name=param_name) == expected_result
+
+
+def test_hash_key_is_cached():
+    hash_key.cache_clear()
+
+    key = "https://www.example.com"
+    assert hash_key(key) == "cdb4d88dca0bef8defe13d71624a46e7e851750a750a5467d53cb1bf273ab973"
+    assert hash_key(key) == hash_key(key, HASH_SHA256)
+    assert hash_key.cache_info().misses == 2
+    assert len(hash_key(key, HASH_BLAKE2B, 8)) == 16
+
+    with pytest.raises(ValueError):
+        hash_key(key, "md5")
+
+
+def test_get_hashed_many():
+    instance = initialize()
+    instance.set_hashed("https://www.example.net", 7)
+
+    assert instance.get_hashed_many(["https://www.example.net", "unknown"], "default") == {
+        "https://www.example.net": 7, "unknown": "default"
+    }
+
+
+@pytest.mark.parametrize(
+    argnames=('legacy_sha256', 'expected_value'),
+    argvalues=[(True, 7), (False, None)],
+)
+def test_get_hashed_many_blake2b_with_legacy_keys(legacy_sha256, expected_value):
+    instance = initialize()
+    instance.set_hashed("https://www.example.net", 7)
+
+    values = instance.get_hashed_many(
+        ["https://www.example.net"], hash_algorithm=HASH_BLAKE2B, legacy_sha256=legacy_sha256
+    )
+
+    assert values == {"https://www.example.net": expected_value}
+
+
+def test_set_hashed_many():
+    instance = initialize()
+    legacy_value = instance.get_hashed("https://www.example.com")
+    values = {"https://www.example.com": 43, "https://www.example.org": 44}
+
+    instance.set_hashed_many(values, hash_algorithm=HASH_BLAKE2B, digest_size=8)
+
+    assert instance.get_hashed_many(
+        list(values), hash_algorithm=HASH_BLAKE2B, digest_size=8
+    ) == values
+    assert instance.get(hash_key("https://www.example.org", HASH_BLAKE2B, 8)) == 44
+    # The existing sha256 key stays untouched
+    assert instance.get_hashed("https://www.example.com") == legacy_value
+
+
+def test_yaml_backend():
+    expected_backend = "libyaml" if yaml.__with_libyaml__ else "python"
+
+    assert Storage.yaml_backend() == expected_backend
+
+
+@pytest.mark.parametrize(argnames='extension', argvalues=[".yaml", ".json", ".bin", ".pickle"])
+def test_storage_backends_by_extension(tmp_path, extension):
+    filename = str(tmp_path / f"storage{extension}")
+    instance = Storage(filename=filename)
+    instance.set("foo.bar", [1, 2])
+    instance.set("que", "tal")
+    instance.write_file()
+
+    assert Storage(filename=filename).get_all() == {"foo": {"bar": [1, 2]}, "que": "tal"}
+
+
+def test_storage_backend_by_parameter(tmp_path):
+    filename = str(tmp_path / "storage.data")
+    instance = Storage(filename=filename, backend="json")
+    instance.set("que", "tal")
+    instance.write_file()
+
+    with open(filename, "r") as stream:
+        assert stream.read() == '{"que":"tal"}'
+    assert Storage(filename=filename, backend="json").get("que") == "tal"
+
+
+def test_convert_file(tmp_path):
+    source = str(tmp_path / "storage.yaml")
+    destination = str(tmp_path / "storage.bin")
+    instance = Storage(filename=source)
+    instance.set("foo.bar", "hola")
+    instance.write_file()
+
+    Storage.convert_file(source, destination)
+
+    converted = Storage(filename=destination)
+    assert converted.get_backend().name == "binary"
+    assert converted.get_all() == {"foo": {"bar": "hola"}}
+
+
+@pytest.mark.parametrize(
+    argnames=('durability', 'expected_fsyncs'),
+    argvalues=[(DURABILITY_NONE, 0), (DURABILITY_FILE, 1), (DURABILITY_FULL, 2)],
+)
+def test_write_file_is_atomic(tmp_path, durability, expected_fsyncs):
+    filename = tmp_path / "storage.yaml"
+    filename.write_text("que: tal\n")
+    os.chmod(filename, 0o600)
+    instance = Storage(filename=str(filename), durability=durability)
+    instance.set("que", "passa")
+
+    mocked_fsync = Mock()
+    with patch.object(os, "fsync", new=mocked_fsync):
+        instance.write_file()
+
+    assert mocked_fsync.call_count == expected_fsyncs
+    assert os.listdir(tmp_path) == ["storage.yaml"]
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o600
+    assert Storage(filename=str(filename)).get("que") == "passa"
+
+
+def test_write_file_failure_keeps_the_previous_file(tmp_path):
+    filename = tmp_path / "storage.json"
+    filename.write_text('{"que":"tal"}')
+    instance = Storage(filename=str(filename))
+    instance.set("que", object())
+
+    with pytest.raises(TypeError):
+        instance.write_file()
+
+    assert os.listdir(tmp_path) == ["storage.json"]
+    assert filename.read_text() == '{"que":"tal"}'
+
+
+def test_write_file_replaces_the_symlink_target(tmp_path):
+    target = tmp_path / "target.yaml"
+    target.write_text("que: tal\n")
+    link = tmp_path / "link.yaml"
+    link.symlink_to(target)
+    instance = Storage(filename=str(link))
+    instance.set("que", "passa")
+
+    instance.write_file()
+
+    assert link.is_symlink()
+    assert Storage(filename=str(target)).get("que") == "passa"
+
+
+def test_unknown_durability():
+    with pytest.raises(ValueError):
+        Storage(filename="storage.yaml", durability="paranoid")
+
+
+@pytest.mark.parametrize(
+    argnames='change',
+    argvalues=[
+        lambda instance: instance.set("foo.bar", "adeu"),
+        lambda instance: instance.delete("que"),
+        lambda instance: instance.merge(Storage(filename="other.yaml")),
+        lambda instance: instance.set_hashed("https://www.example.com", 1),
+        lambda instance: instance.set_slugged("https://www.example.com", 1),
+        lambda instance: instance.set_hashed_many({"https://www.example.com": 1}),
+        lambda instance: instance.remove_none(),
+        lambda instance: instance.mark_dirty(),
+    ],
+)
+@patch("os.path.exists", new=os_path_exists_true)
+def test_changes_make_the_storage_dirty(change):
+    with patch.object(Storage, "_load_file_contents", new=Mock(return_value={"que": "tal"})):
+        instance = Storage(filename=FILENAME)
+        assert instance.is_dirty() is False
+
+        change(instance)
+
+    assert instance.is_dirty() is True
+
+
+def test_flush_and_skip_clean_writes(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+    mocked_write = Mock()
+    with patch.object(Storage, "_write_file_contents", new=mocked_write):
+        instance = Storage(filename=filename)
+        assert instance.flush() is False
+        instance.write_file()
+        assert mocked_write.call_count == 1
+
+        instance.set("que", "tal")
+        assert instance.flush() is True
+        assert instance.is_dirty() is False
+        assert instance.flush() is False
+        assert mocked_write.call_count == 2
+
+        skipping = Storage(filename=filename, skip_clean_writes=True)
+        skipping.write_file()
+        assert mocked_write.call_count == 2
+        skipping.set("que", "tal")
+        skipping.write_file()
+        assert mocked_write.call_count == 3
+
+
+def wait_for_writes(mocked_write: Mock, amount: int, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while mocked_write.call_count < amount and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return mocked_write.call_count >= amount
+
+
+def test_autosave_after_mutations(tmp_path):
+    mocked_write = Mock()
+    with patch.object(Storage, "_write_file_contents", new=mocked_write):
+        instance = Storage(filename=str(tmp_path / "storage.yaml"), autosave_mutations=2)
+        instance.set("foo", 1)
+        assert instance.is_dirty() is True
+
+        instance.set("bar", 2)
+        assert wait_for_writes(mocked_write, 1) is True
+        instance.close()
+
+    written_content = mocked_write.call_args[0][1]
+    assert written_content == {"foo": 1, "bar": 2}
+    # It writes a snapshot, not the live content
+    assert written_content is not instance.get_all()
+    assert mocked_write.call_count == 1
+    assert instance.is_dirty() is False
+
+
+def test_autosave_every_interval(tmp_path):
+    mocked_write = Mock()
+    with patch.object(Storage, "_write_file_contents", new=mocked_write):
+        instance = Storage(filename=str(tmp_path / "storage.yaml"), autosave_interval=0.01)
+        instance.set("foo", 1)
+        assert wait_for_writes(mocked_write, 1) is True
+
+        instance.set("foo", 2)
+        assert wait_for_writes(mocked_write, 2) is True
+        instance.close()
+
+    assert mocked_write.call_args[0][1] == {"foo": 2}
+
+
+def test_close_flushes_synchronously(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+
+    with Storage(filename=filename, autosave_interval=3600) as instance:
+        instance.set("foo", 1)
+
+    assert instance._autosave_thread is None
+    assert Storage(filename=filename).get("foo") == 1
+
+
+def test_lazy_binary_loads_only_the_requested_keys(tmp_path):
+    filename = str(tmp_path / "storage.bin")
+    instance = Storage(filename=filename)
+    for index in range(50):
+        instance.set(f"key_{index}", {"index": index})
+    instance.write_file()
+
+    instance = Storage(filename=filename, lazy=True)
+    assert instance.is_lazy() is True
+    assert instance.get_all().loaded_keys() == []
+
+    assert instance.get("key_7.index") == 7
+    assert instance.key_exists("key_99") is False
+    assert instance.get_all().loaded_keys() == ["key_7"]
+
+    instance.set("key_7.index", 70)
+    instance.delete("key_8")
+    instance.write_file()
+
+    content = Storage(filename=filename).get_all()
+    assert len(content) == 49
+    assert content["key_7"] == {"index": 70}
+    assert "key_8" not in content
+
+
+def test_lazy_parses_on_first_access(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+    with open(filename, "w") as stream:
+        stream.write("foo:\n  bar: hola\nque: tal\n")
+
+    with patch.object(Storage, "_load_file_contents",
+                      wraps=Storage._load_file_contents) as load:
+        instance = Storage(filename=filename, lazy=True)
+        load.assert_not_called()
+
+        assert instance.get("foo.bar") == "hola"
+        assert instance.get("que") == "tal"
+        load.assert_called_once()
+
+    instance.set_hashed("https://www.example.com", 1)
+    instance.write_file()
+    with open(filename, "r") as stream:
+        assert yaml.safe_load(stream) == {
+            "foo": {
+                "bar": "hola"
+            }, "que": "tal", hash_key("https://www.example.com"): 1
+        }
+
+
+def test_lazy_new_file(tmp_path):
+    for extension in ["yaml", "bin"]:
+        filename = str(tmp_path / f"storage.{extension}")
+        instance = Storage(filename=filename, lazy=True)
+
+        assert instance.get("foo") is None
+        instance.set("foo", "bar")
+        instance.write_file()
+
+        assert Storage(filename=filename, lazy=True).get("foo") == "bar"
+
+
+def test_lazy_needs_a_dict(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+    with open(filename, "w") as stream:
+        stream.write("- one\n- two\n")
+
+    instance = Storage(filename=filename, lazy=True)
+    with pytest.raises(RuntimeError):
+        instance.get("foo")
+
+
+def increment_in_transactions(filename: str, times: int) -> None:
+    instance = Storage(filename=filename, file_locking=True)
+    for _ in range(times):
+        with instance.transaction():
+            instance.set("counter", instance.get("counter", 0) + 1)
+
+
+def test_transactions_do_not_lose_updates(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+    Storage(filename=filename, file_locking=True)
+
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=increment_in_transactions, args=(filename, 25))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert Storage(filename=filename).get("counter") == 100
+    assert os.path.exists(filename + ".lock")
+
+
+def test_transaction_discards_on_error(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+    instance = Storage(filename=filename, file_locking=True)
+    instance.set("foo", "bar")
+    instance.write_file()
+
+    with pytest.raises(ValueError):
+        with instance.transaction():
+            instance.set("foo", "changed")
+            raise ValueError("Something went wrong")
+
+    assert instance.get("foo") == "bar"
+    assert Storage(filename=filename).get("foo") == "bar"
+    assert instance._lock_depth == 0
+    assert instance._lock_stream is None
+
+
+def test_file_locks_are_nested(tmp_path):
+    filename = str(tmp_path / "storage.yaml")
+    instance = Storage(filename=filename, file_locking=True)
+
+    with patch("pyxavi.storage.fcntl.flock") as flock:
+        with instance._file_lock():
+            with instance._file_lock():
+                assert instance._lock_exclusive is False
+                with instance._file_lock(exclusive=True):
+                    assert instance._lock_depth == 3
+            assert instance._lock_exclusive is True
+
+    import fcntl
+    assert [call.args[1]
+            for call in flock.call_args_list] == [fcntl.LOCK_SH, fcntl.LOCK_EX, fcntl.LOCK_UN]
+    assert instance._lock_depth == 0
+
+
+def test_file_locking_needs_fcntl(tmp_path):
+    with patch("pyxavi.storage.fcntl", new=None):
+        with pytest.raises(RuntimeError):
+            Storage(filename=str(tmp_path / "storage.yaml"), file_locking=True)
@@ -0,0 +1,62 @@
+from pyxavi.storage_backend import get_storage_backend, BinaryBackend, STORAGE_BACKENDS
+from pyxavi.storage_backend import BACKEND_YAML, BACKEND_JSON, BACKEND_BINARY, BACKEND_PICKLE
+from unittest import TestCase
+import pytest
+import io
+
+CONTENT = {"foo": {"bar": "hola", "list": [1, 2.5, None, True]}, "que": "tal"}
+
+
+@pytest.mark.parametrize(
+    argnames=('filename', 'backend', 'expected_backend'),
+    argvalues=[
+        ("storage.yaml", None, BACKEND_YAML),
+        ("storage.yml", None, BACKEND_YAML),
+        ("storage.JSON", None, BACKEND_JSON),
+        ("storage.bin", None, BACKEND_BINARY),
+        ("storage.pkl", None, BACKEND_PICKLE),
+        ("storage.txt", None, BACKEND_YAML),
+        ("storage.yaml", BACKEND_JSON, BACKEND_JSON),
+    ],
+)
+def test_get_storage_backend(filename, backend, expected_backend):
+    assert get_storage_backend(filename, backend).name == expected_backend
+
+
+def test_get_storage_backend_unknown():
+    with TestCase.assertRaises("pyxavi.storage_backend", ValueError):
+        get_storage_backend("storage.yaml", "xml")
+
+
+@pytest.mark.parametrize(argnames='name', argvalues=list(STORAGE_BACKENDS))
+@pytest.mark.parametrize(argnames='content', argvalues=[CONTENT, ["a", "b"], {}])
+def test_backends_round_trip(name, content):
+    backend = STORAGE_BACKENDS[name]
+
+    assert backend.loads(backend.dumps(content)) == content
+
+    stream = io.BytesIO() if backend.binary else io.StringIO()
+    backend.dump(content, stream)
+    stream.seek(0)
+    assert backend.load(stream) == content
+
+
+@pytest.mark.parametrize(argnames='name', argvalues=list(STORAGE_BACKENDS))
+def test_backends_load_empty_files(name):
+    backend = STORAGE_BACKENDS[name]
+
+    assert backend.load(io.BytesIO() if backend.binary else io.StringIO()) is None
+
+
+def test_binary_backend_sections():
+    data = STORAGE_BACKENDS[BACKEND_BINARY].dumps(CONTENT)
+
+    _, index, data_start = BinaryBackend.read_index(data)
+
+    assert list(index) == ["foo", "que"]
+    offset, size = index["que"]
+    assert data[data_start + offset:data_start + offset + size] ==\
+        STORAGE_BACKENDS[BACKEND_BINARY].dumps(CONTENT)[-size:]
+
+    with TestCase.assertRaises("pyxavi.storage_backend", ValueError):
+        BinaryBackend.read_index(b"not a binary storage")
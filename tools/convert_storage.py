@@ -0,0 +1,36 @@
+"""
+Converts Storage files between formats
+
+The formats are chosen by the file extensions (.yaml, .json, .bin, .pickle)
+    unless they are given. Useful to migrate hot state files out of YAML.
+
+    $ poetry run python tools/convert_storage.py storage/queue.yaml storage/queue.bin
+"""
+from pyxavi import Storage
+from pyxavi.storage_backend import STORAGE_BACKENDS
+import argparse
+import os
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts Storage files between formats")
+    parser.add_argument("source", help="Storage file to read")
+    parser.add_argument("destination", help="Storage file to write")
+    parser.add_argument("--from", dest="source_backend", choices=list(STORAGE_BACKENDS))
+    parser.add_argument("--to", dest="destination_backend", choices=list(STORAGE_BACKENDS))
+    parser.add_argument(
+        "--force", action="store_true", help="Overwrite the destination if it exists"
+    )
+    arguments = parser.parse_args()
+
+    if not os.path.exists(arguments.source):
+        parser.error(f"Storage file [{arguments.source}] not found")
+    if os.path.exists(arguments.destination) and not arguments.force:
+        parser.error(f"Storage file [{arguments.destination}] already exists. Use --force")
+
+    Storage.convert_file(
+        arguments.source,
+        arguments.destination,
+        source_backend=arguments.source_backend,
+        destination_backend=arguments.destination_backend
+    )
+    print(f"Converted [{arguments.source}] into [{arguments.destination}]")